@@ -0,0 +1,74 @@
+import json
+import mmap
+import os
+import struct
+from typing import Any
+
+import numpy as np
+
+# File layout: MAGIC, header length (uint32, little endian), JSON header, then the arrays.
+# The header holds the metadata and the dtype, shape and offset of every array.
+MAGIC = b"TCBUNDLE"
+VERSION = 1
+
+# Arrays start on multiples of this many bytes
+ALIGNMENT = 64
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_bundle(path: str, metadata: dict[str, Any], arrays: dict[str, np.ndarray]):
+    """
+    Write JSON-serializable metadata and arrays to a single uncompressed file that can be memory-mapped
+    """
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({"version": VERSION, "metadata": metadata, "arrays": layout}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 4 + len(header))
+
+    # Write to a temporary file first so a running extraction never maps a partial bundle
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def load_bundle(path: str) -> tuple[dict[str, Any], dict[str, np.ndarray]]:
+    """
+    Map a bundle into memory. The returned arrays are read-only views of the mapping,
+    so loading costs one mmap call and pages are read on first use.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapped[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a classifier bundle")
+    (header_length,) = struct.unpack_from("<I", mapped, len(MAGIC))
+    header_start = len(MAGIC) + 4
+    header = json.loads(mapped[header_start : header_start + header_length])
+    if header["version"] != VERSION:
+        raise ValueError(f"Unsupported classifier bundle version {header['version']} in {path}")
+
+    data_start = _align(header_start + header_length)
+    arrays = {}
+    for name, info in header["arrays"].items():
+        dtype = np.dtype(info["dtype"])
+        count = int(np.prod(info["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            mapped, dtype=dtype, count=count, offset=data_start + info["offset"]
+        ).reshape(info["shape"])
+    return header["metadata"], arrays
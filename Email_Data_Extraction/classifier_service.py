@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import Any, Callable
+
+from verdict_cache import VerdictCache
+
+# Flush as soon as this many titles are waiting
+MAX_BATCH_SIZE = 256
+
+# Otherwise flush this long after the first title of a batch arrived, in seconds
+MAX_BATCH_DELAY = 0.005
+
+
+class BatchingClassifier:
+    """
+    Score titles submitted by concurrent coroutines in batches, with one forward pass per batch.
+
+    `score` queues a title and waits on a future. The queued titles are sent to the classifier
+    when `max_batch_size` of them are waiting, or `max_delay` seconds after the first one
+    arrived, whichever comes first. The forward pass runs in a thread so the event loop
+    keeps filling the next batch meanwhile.
+
+    With a `cache`, titles scored before are answered from it without queueing, and a title
+    already waiting for a score shares that pending result instead of being queued twice.
+    `close` cancels whatever is still queued or being scored when the run ends.
+    """
+
+    def __init__(
+        self,
+        # Returns an object with a `score(titles) -> list[float]` method, such as EmailTitleClassifier
+        load_classifier: Callable[[], Any],
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_delay: float = MAX_BATCH_DELAY,
+        cache: VerdictCache | None = None,
+    ):
+        self.load_classifier = load_classifier
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.cache = cache
+
+        self._titles: list[str] = []
+        self._futures: list[asyncio.Future] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # Title -> future of its score, for titles queued or being scored
+        self._pending: dict[str, asyncio.Future] = {}
+        # Forward passes run one at a time
+        self._lock = asyncio.Lock()
+        # Batches being scored
+        self._tasks: set[asyncio.Task] = set()
+
+        # Metrics
+        self.batches = 0
+        self.scored = 0
+        # Titles that waited for the score of an identical queued title
+        self.coalesced = 0
+        self.busy_seconds = 0.0
+
+    async def score(self, title: str) -> float:
+        if self.cache is not None:
+            score = self.cache.get(title)
+            if score is not None:
+                return score
+
+            future = self._pending.get(title)
+            if future is not None:
+                self.coalesced += 1
+                # Shielded, so that a cancelled waiter doesn't cancel the other waiters' future
+                return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._titles.append(title)
+        self._futures.append(future)
+        if self.cache is not None:
+            self._pending[title] = future
+
+        if len(self._titles) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._titles:
+            return
+
+        titles, futures = self._titles, self._futures
+        self._titles, self._futures = [], []
+        # The loop only keeps weak references to tasks, an unreferenced batch could vanish mid-flight
+        task = asyncio.get_running_loop().create_task(self._run_batch(titles, futures))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, titles: list[str], futures: list[asyncio.Future]):
+        try:
+            async with self._lock:
+                start = time.monotonic()
+                try:
+                    scores = await asyncio.to_thread(self._score_batch, titles)
+                finally:
+                    self.busy_seconds += time.monotonic() - start
+
+            self.batches += 1
+            self.scored += len(titles)
+            for title, future, score in zip(titles, futures, scores):
+                if self.cache is not None:
+                    self.cache.put(title, score)
+                future.set_result(score)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as e:
+            # Every waiter gets the error, none is left waiting
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for title in titles:
+                self._pending.pop(title, None)
+
+    async def close(self):
+        """
+        Cancel the queued titles and the batches being scored, and wait until they have stopped
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for future in self._futures:
+            future.cancel()
+        self._titles, self._futures = [], []
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _score_batch(self, titles: list[str]) -> list[float]:
+        return self.load_classifier().score(titles)
+
+    def report(self) -> str:
+        if not self.batches:
+            return "Title classifier: not needed, the model was never loaded"
+        average = self.scored / self.batches
+        return (
+            f"Title classifier: {self.scored} titles in {self.batches} batches "
+            f"(average {average:.1f}), {self.coalesced} shared a queued title's score, "
+            f"busy {self.busy_seconds:.2f}s"
+        )
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import sys
+
+from extraction import index, parser
+from extractors.base_extractor import EmailContent
+from extractors.plaintext import PLAINTEXT_BACKENDS, set_plaintext_backend
+from mail_sources import iter_messages
+
+# The reference backend, the others must give the same transactions
+REFERENCE_BACKEND = "html2text"
+
+
+def run_extractors(raw: bytes) -> tuple[list[dict], str | None, float]:
+    """
+    Run every matching extractor on a message with the current plaintext backend.
+    Returns the transactions (with values as strings), the plaintext and the time spent converting it.
+    """
+    content = EmailContent(parser.parsebytes(raw))
+    results = []
+    for ex in index.match(content.title, content.from_email):
+        try:
+            trxs = ex.extract(content)
+        except Exception as e:
+            results.append({"extractor": type(ex).__name__, "error": str(e)})
+            continue
+        for trx in trxs:
+            results.append({"extractor": type(ex).__name__, **{k: str(v) for k, v in vars(trx).items()}})
+
+    try:
+        plaintext = content.get_plaintext()
+    except ValueError:
+        plaintext = None
+    return results, plaintext, content.timings.get("plaintext", 0.0)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Check that every plaintext backend gives the extractors the same transactions"
+    )
+    arg_parser.add_argument("path", nargs="?", default="dumped", help="Messages to check, as for --replay (default: dumped)")
+    arg_parser.add_argument(
+        "--golden",
+        metavar="FILE",
+        help="JSON file of the expected transactions per message. Every backend is checked against it as well.",
+    )
+    arg_parser.add_argument(
+        "--update",
+        action="store_true",
+        help=f"Write the transactions of the {REFERENCE_BACKEND} backend to the --golden file instead of checking it",
+    )
+    args = arg_parser.parse_args()
+
+    golden = None
+    if args.golden and not args.update and os.path.exists(args.golden):
+        with open(args.golden) as f:
+            golden = json.load(f)
+
+    messages = 0
+    transactions = 0
+    reference_results = {}
+    seconds = {backend: 0.0 for backend in PLAINTEXT_BACKENDS}
+    plaintext_differs = []
+    transactions_differ = []
+
+    for message_id, raw in iter_messages(args.path):
+        messages += 1
+        results = {}
+        plaintexts = {}
+        for backend in PLAINTEXT_BACKENDS:
+            set_plaintext_backend(backend)
+            results[backend], plaintexts[backend], elapsed = run_extractors(raw)
+            seconds[backend] += elapsed
+
+        reference = results[REFERENCE_BACKEND]
+        reference_results[message_id] = reference
+        transactions += len(reference)
+
+        expected = golden.get(message_id) if golden is not None else None
+        for backend in PLAINTEXT_BACKENDS:
+            if plaintexts[backend] != plaintexts[REFERENCE_BACKEND]:
+                plaintext_differs.append((message_id, backend))
+            if results[backend] != reference:
+                transactions_differ.append((message_id, backend, f"differs from {REFERENCE_BACKEND}"))
+            if expected is not None and results[backend] != expected:
+                transactions_differ.append((message_id, backend, f"differs from {args.golden}"))
+
+    set_plaintext_backend(REFERENCE_BACKEND)
+
+    if args.golden and args.update:
+        with open(args.golden, "w") as f:
+            json.dump(reference_results, f, indent=1, ensure_ascii=False)
+        print(f"Wrote the transactions of {messages} messages to {args.golden}")
+
+    print(f"Checked {messages} messages, {transactions} transactions")
+    for backend in PLAINTEXT_BACKENDS:
+        print(f"  {backend}: {seconds[backend]:.2f}s converting to plaintext")
+    print(f"Plaintext differs for {len(plaintext_differs)} message/backend pairs")
+    for message_id, backend in plaintext_differs[:20]:
+        print(f"  {message_id} ({backend})")
+
+    if transactions_differ:
+        print(f"Transactions differ for {len(transactions_differ)} message/backend pairs:")
+        for message_id, backend, reason in transactions_differ:
+            print(f"  {message_id} ({backend}): {reason}")
+        sys.exit(1)
+    print("Every backend gives the same transactions")
+
+
+if __name__ == "__main__":
+    main()
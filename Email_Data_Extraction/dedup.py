@@ -0,0 +1,233 @@
+import datetime
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+
+from extractors.base_extractor import TransactionData
+from output_sink import to_datetime
+
+DEDUP_DIR = "cache"
+
+# Transactions without an ID match others of the same amount this close in time
+DEDUP_WINDOW = datetime.timedelta(minutes=10)
+
+# Keys kept in memory, older ones are looked up on disk
+DEDUP_MEMORY_KEYS = 100_000
+
+# What extractors set as the transaction ID when there is none
+MISSING_IDS = ("", "-", "None")
+
+
+def dedup_path(output_path: str) -> str:
+    """
+    Every output has its own dedup state, as it describes the rows in that output
+    """
+    return os.path.join(DEDUP_DIR, f"dedup-{os.path.basename(output_path)}.sqlite3")
+
+
+def _digest(*parts: str) -> bytes:
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=16).digest()
+
+
+def _amount(tx: TransactionData) -> str:
+    value = getattr(tx, "amount", None)
+    try:
+        # 50000, 50000.00 and 5E+4 are the same amount
+        return str(Decimal(str(value)).normalize())
+    except InvalidOperation:
+        return str(value)
+
+
+def transaction_id(tx: TransactionData) -> str | None:
+    trx_id = getattr(tx, "trx_id", None)
+    if trx_id is None or str(trx_id).strip() in MISSING_IDS:
+        return None
+    return str(trx_id).strip()
+
+
+def transaction_time(tx: TransactionData) -> int | None:
+    """
+    The transaction time in seconds, in the local time the emails use
+    """
+    try:
+        date = to_datetime(getattr(tx, "date", None))
+    except (ValueError, AttributeError):
+        return None
+    if date is None:
+        return None
+    return int(date.replace(tzinfo=datetime.timezone.utc).timestamp())
+
+
+class TransactionDeduplicator:
+    """
+    Streaming deduplication of the transactions extracted from different emails.
+
+    A transaction is a duplicate of one kept before if:
+    - both have the same (transaction ID, amount, currency), or
+    - either has no transaction ID, and both have the same amount and currency and are
+      at most `window` apart, or
+    - both come from the same email, read by different extractors, with the same amount
+      and currency (e.g. GrabExtractor and GrabFoodExtractor on one Grab e-receipt).
+
+    Kept transactions are recorded in a SQLite database, so duplicates are also found across
+    runs that add to the same output. The most recent `max_memory_keys` keys are also kept in
+    memory, where duplicates, which usually arrive close together, are found without a query.
+    A message that is processed again after an interrupted run keeps its own transactions.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        append: bool,
+        window: datetime.timedelta = DEDUP_WINDOW,
+        max_memory_keys: int = DEDUP_MEMORY_KEYS,
+    ):
+        self.window = int(window.total_seconds())
+        self.max_memory_keys = max_memory_keys
+
+        # Key -> (message ID, source) of the kept transaction
+        self._ids: OrderedDict[bytes, tuple[str, str]] = OrderedDict()
+        # (amount, currency) key -> [(time, has ID, message ID, source)] of kept transactions
+        self._amounts: OrderedDict[bytes, list[tuple[int, bool, str, str]]] = OrderedDict()
+        self._memory_keys = 0
+
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path or ":memory:", isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        if not append:
+            # A fresh output has no transactions to be duplicates of
+            self.conn.execute("DROP TABLE IF EXISTS ids")
+            self.conn.execute("DROP TABLE IF EXISTS amounts")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS ids (key BLOB PRIMARY KEY, message_id TEXT, source TEXT) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS amounts (key BLOB, at INTEGER, has_id INTEGER, message_id TEXT, source TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS amounts_key_at ON amounts (key, at)")
+
+        # Metrics
+        self.seen = 0
+        self.by_id = 0
+        self.by_window = 0
+        self.by_message = 0
+
+    def _remember_id(self, key: bytes, origin: tuple[str, str]):
+        self._ids[key] = origin
+        self._ids.move_to_end(key)
+        self._memory_keys += 1
+        self._evict()
+
+    def _remember_amount(self, key: bytes, entry: tuple[int, bool, str, str]):
+        self._amounts.setdefault(key, []).append(entry)
+        self._amounts.move_to_end(key)
+        self._memory_keys += 1
+        self._evict()
+
+    def _evict(self):
+        # Everything is on disk as well, so the oldest keys can simply be dropped
+        while self._memory_keys > self.max_memory_keys:
+            if len(self._ids) >= len(self._amounts):
+                self._ids.popitem(last=False)
+                self._memory_keys -= 1
+            else:
+                _, entries = self._amounts.popitem(last=False)
+                self._memory_keys -= len(entries)
+
+    def _id_origin(self, key: bytes) -> tuple[str, str] | None:
+        origin = self._ids.get(key)
+        if origin is not None:
+            self._ids.move_to_end(key)
+            return origin
+        row = self.conn.execute("SELECT message_id, source FROM ids WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._remember_id(key, (row[0], row[1]))
+        return row[0], row[1]
+
+    def _window_match(self, key: bytes, at: int, has_id: bool, origin: tuple[str, str]) -> bool:
+        """
+        Whether a kept transaction of another origin and the same amount is within the window,
+        where at least one of the two has no ID
+        """
+        entries = self._amounts.get(key)
+        if entries is not None:
+            for entry_at, entry_has_id, message_id, source in entries:
+                if (
+                    abs(entry_at - at) <= self.window
+                    and not (has_id and entry_has_id)
+                    and (message_id, source) != origin
+                ):
+                    return True
+        row = self.conn.execute(
+            "SELECT 1 FROM amounts WHERE key = ? AND at BETWEEN ? AND ? AND (? OR NOT has_id) "
+            "AND NOT (message_id = ? AND source = ?) LIMIT 1",
+            (key, at - self.window, at + self.window, not has_id, *origin),
+        ).fetchone()
+        return row is not None
+
+    def filter(self, message_id: str, trxs: list[TransactionData]) -> list[TransactionData]:
+        """
+        The transactions of a message that aren't duplicates, which are then recorded as kept
+        """
+        kept = []
+        # (amount, currency) key -> sources of this message's kept transactions
+        message_amounts: dict[bytes, set[str]] = {}
+        id_rows = []
+        amount_rows = []
+
+        for tx in trxs:
+            self.seen += 1
+            source = getattr(tx, "source", "")
+            origin = (message_id, source)
+            currency = str(getattr(tx, "currency", ""))
+            amount_key = _digest(_amount(tx), currency)
+            trx_id = transaction_id(tx)
+            at = transaction_time(tx)
+
+            if message_amounts.get(amount_key, set()) - {source}:
+                self.by_message += 1
+                continue
+
+            id_key = _digest(trx_id, _amount(tx), currency) if trx_id is not None else None
+            id_origin = self._id_origin(id_key) if id_key is not None else None
+            if id_origin is not None and id_origin != origin:
+                self.by_id += 1
+                continue
+            if at is not None and self._window_match(amount_key, at, trx_id is not None, origin):
+                self.by_window += 1
+                continue
+
+            if id_key is not None and id_origin is None:
+                self._remember_id(id_key, origin)
+                id_rows.append((id_key, *origin))
+            if at is not None:
+                self._remember_amount(amount_key, (at, trx_id is not None, *origin))
+                amount_rows.append((amount_key, at, trx_id is not None, *origin))
+            message_amounts.setdefault(amount_key, set()).add(source)
+            kept.append(tx)
+
+        if id_rows or amount_rows:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("INSERT OR IGNORE INTO ids (key, message_id, source) VALUES (?, ?, ?)", id_rows)
+            self.conn.executemany(
+                "INSERT INTO amounts (key, at, has_id, message_id, source) VALUES (?, ?, ?, ?, ?)", amount_rows
+            )
+            self.conn.execute("COMMIT")
+        return kept
+
+    def duplicates(self) -> int:
+        return self.by_id + self.by_window + self.by_message
+
+    def report(self) -> str:
+        return (
+            f"Dedup: {self.duplicates()} of {self.seen} transactions were duplicates "
+            f"({self.by_id} by ID, {self.by_window} by time window, {self.by_message} read twice from one email)"
+        )
+
+    def close(self):
+        self.conn.close()
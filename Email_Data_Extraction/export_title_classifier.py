@@ -0,0 +1,148 @@
+import argparse
+import csv
+import os
+
+import keras
+import numpy as np
+import tensorflow as tf
+
+import title_classifier
+from classifier_bundle import save_bundle
+from numpy_title_classifier import NumpyEmailTitleClassifier
+from tflite_title_classifier import TFLiteEmailTitleClassifier
+
+DATASET_DIR = "title-classification-ds"
+
+FORMATS = ("bundle", "tflite-dynamic", "tflite-int8")
+
+DEFAULT_OUTPUTS = {
+    "bundle": "trained/email_titles_nlp.bundle",
+    "tflite-dynamic": "trained/email_titles_nlp.tflite",
+    "tflite-int8": "trained/email_titles_nlp.int8.tflite",
+}
+
+
+def export_bundle(classifier: title_classifier.EmailTitleClassifier, path: str):
+    """
+    Save the weights and vocabulary of a classifier as a bundle for NumpyEmailTitleClassifier
+    """
+    arrays = {}
+    activations = []
+    for layer in classifier.model.layers:
+        if isinstance(layer, keras.layers.Embedding):
+            arrays["embedding"] = np.asarray(layer.get_weights()[0], dtype=np.float32)
+        elif isinstance(layer, keras.layers.Dense):
+            kernel, bias = layer.get_weights()
+            arrays[f"dense_{len(activations)}_kernel"] = np.asarray(kernel, dtype=np.float32)
+            arrays[f"dense_{len(activations)}_bias"] = np.asarray(bias, dtype=np.float32)
+            activations.append(layer.get_config()["activation"])
+        elif not isinstance(layer, (keras.layers.InputLayer, keras.layers.GlobalAveragePooling1D, keras.layers.Dropout)):
+            raise ValueError(f"Layer {layer.name} ({type(layer).__name__}) can't be exported")
+
+    metadata = {
+        "vocabulary": classifier.vectorizer.vocabulary,
+        "sequence_length": classifier.vectorizer.sequence_length,
+        "dense_activations": activations,
+    }
+    save_bundle(path, metadata, arrays)
+
+
+def export_tflite(classifier: title_classifier.EmailTitleClassifier, path: str, int8: bool, calibration_titles: list[str]):
+    """
+    Convert the model to a TFLite flatbuffer for TFLiteEmailTitleClassifier.
+
+    Without `int8`, weights are quantized to int8 and activations stay float (dynamic range).
+    With `int8`, activations are quantized too, calibrated on `calibration_titles`.
+    Inputs and outputs stay float32 in both cases.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(classifier.model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if int8:
+        samples = classifier.vectorizer(calibration_titles).astype(np.float32)
+
+        def representative_dataset():
+            for sample in samples:
+                yield [sample[np.newaxis, :]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def load_labelled_titles(dataset_dir: str = DATASET_DIR) -> tuple[list[str], list[bool]]:
+    titles = []
+    labels = []
+    if os.path.isdir(dataset_dir):
+        for name in sorted(os.listdir(dataset_dir)):
+            if name.endswith(".csv"):
+                with open(os.path.join(dataset_dir, name), newline="") as f:
+                    for row in csv.DictReader(f):
+                        titles.append(row["title"])
+                        labels.append(row["is_transaction"].strip().lower() in ("1", "1.0", "true"))
+    return titles, labels
+
+
+def compare(reference, candidate, titles: list[str], labels: list[bool], threshold: float = 0.5) -> str:
+    """
+    Report how far the candidate's scores and verdicts are from the reference classifier's
+    """
+    expected = np.array(reference.score(titles))
+    actual = np.array(candidate.score(titles))
+    difference = np.abs(expected - actual)
+    agreement = np.mean((expected > threshold) == (actual > threshold))
+
+    lines = [
+        f"Checked {len(titles)} titles: max score difference {difference.max():.2e}, "
+        f"mean {difference.mean():.2e}, same verdict for {agreement:.2%}"
+    ]
+    if labels:
+        truth = np.array(labels)
+        reference_accuracy = np.mean((expected > threshold) == truth)
+        candidate_accuracy = np.mean((actual > threshold) == truth)
+        lines.append(
+            f"Accuracy on the labelled titles: {reference_accuracy:.2%} (float model), "
+            f"{candidate_accuracy:.2%} (exported), delta {candidate_accuracy - reference_accuracy:+.2%}"
+        )
+    else:
+        lines.append(f"No labelled titles in {DATASET_DIR}, so accuracy was not compared")
+    return "\n".join(lines)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Export the email title classifier for use without the Keras model")
+    arg_parser.add_argument("--model", default="trained/email_titles_nlp.keras")
+    arg_parser.add_argument("--tokenizer", default="trained/tv_layer.pkl")
+    arg_parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="bundle",
+        help="bundle: float weights for the NumPy classifier (default). "
+        "tflite-dynamic: TFLite with int8 weights. tflite-int8: TFLite with int8 weights and activations.",
+    )
+    arg_parser.add_argument("--output", help="Default: trained/email_titles_nlp with the format's extension")
+    args = arg_parser.parse_args()
+    output = args.output or DEFAULT_OUTPUTS[args.format]
+
+    classifier = title_classifier.EmailTitleClassifier(args.model, args.tokenizer)
+    titles, labels = load_labelled_titles()
+    if not titles:
+        # Only enough to check the export, and to calibrate int8 activations on every known token
+        titles = ["Checkout Pesanan dengan GoPay Tabungan by Jago Berhasil from:tokopedia.com"]
+        titles += classifier.vectorizer.vocabulary[2:]
+
+    if args.format == "bundle":
+        export_bundle(classifier, output)
+        exported = NumpyEmailTitleClassifier(output)
+    else:
+        export_tflite(classifier, output, args.format == "tflite-int8", titles)
+        exported = TFLiteEmailTitleClassifier(output, args.tokenizer)
+    print(f"Exported to {output} ({os.path.getsize(output)} bytes)")
+
+    print(compare(classifier, exported, titles, labels))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,279 +1,702 @@
+import argparse
 import asyncio
+import contextlib
 import datetime
-import email
-import importlib
 import os
-import pickle
-import random
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable
 from aiogoogle.client import Aiogoogle
 from aiogoogle.excs import HTTPError
-from aiogoogle.auth.creds import UserCreds, ClientCreds
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-import re
-import json
-import pandas as pd
-import html2text
 import base64
-import csv
-
-from extractors.tokopedia import TokopediaExtractor
-from extractors.grabfood import GrabFoodExtractor
-from extractors.gotagihan import GoTagihanExtractor
-from extractors.google_play import GooglePlayExtractor
-from extractors.grab import GrabExtractor
-from extractors.itemku import ItemkuExtractor
-from extractors.jago import JagoExtractor
-from extractors.mobapay import MobaPayExtractor
-from extractors.mybca import MyBCAExtrator
-from extractors.ocbc import OCBCExtractor
-from extractors.ovo import OVOExtractor
-from extractors.paypal import PaypalExtractor
-from extractors.seabank import SeaBankExtractor
-from extractors.steam import SteamExtractor
-from extractors.unipin import UniPinExtractor
-from extractors.xsolla import XsollaExtractor
-from extractors.gofood import GoFoodExtractor
-from extractors.base_extractor import BaseExtractor, EmailContent, TransactionData
-from extractors.bri import BRIExtractor
-from extractors.eg import EGExtractor
-from extractors.livin import MandiriExtractor
-
-
-
-exs: list[BaseExtractor] = [
-    BRIExtractor(),
-    EGExtractor(),
-    GoFoodExtractor(),
-    GooglePlayExtractor(),
-    GrabExtractor(),
-    ItemkuExtractor(),
-    JagoExtractor(),
-    UniPinExtractor(),
-    MobaPayExtractor(),
-    MyBCAExtrator(),
-    OCBCExtractor(),
-    OVOExtractor(),
-    PaypalExtractor(),
-    SeaBankExtractor(),
-    SteamExtractor(),
-    UniPinExtractor(),
-    XsollaExtractor(),
-    GoTagihanExtractor(),
-    GrabFoodExtractor(),
-    TokopediaExtractor(),
-    MandiriExtractor()
-]
-
-import email
-import email.parser
-import email.message
-import email.policy
-
-parser = email.parser.BytesParser(
-    email.message.EmailMessage, policy=email.policy.default
-)
-
-import extractors.base_extractor
-import title_classifier
-
-# Warning: this script loads all the results into memory, might not be suitable for large datasets
-
-# Initialize InstalledAppFlow with your client secret file
-TOKEN_PICKLE = "token.pickle"
-tc = title_classifier.EmailTitleClassifier(
-    "trained/email_titles_nlp.keras", "trained/tv_layer.pkl"
-)
-
-
-def get_credentials():
-    credentials = None
-
-    if os.path.exists(TOKEN_PICKLE):
-        with open(TOKEN_PICKLE, "rb") as token:
-            credentials = pickle.load(token)
-
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
+
+from extractors.base_extractor import TransactionData
+from extractors.plaintext import PLAINTEXT_BACKENDS, set_plaintext_backend
+from extraction import extract_email_data, index, parser
+
+import gmail_client
+from gmail_batch import GmailBatchTransport
+from rate_limiter import GmailQuotaLimiter
+from pipeline import Pipeline, Stage
+import progress_journal
+from progress_journal import ProgressJournal
+from raw_cache import RawMessageCache
+from mail_sources import aiter_messages
+from output_sink import BufferedSink, CsvSink
+from dedup import TransactionDeduplicator, dedup_path
+from screening import Screener
+import classifier_service
+from classifier_service import BatchingClassifier
+from verdict_cache import VERDICT_CACHE_PATH, VerdictCache, file_hash
+
+# Exported by export_title_classifier.py. The bundle and TFLite models run without the Keras model.
+CLASSIFIER_BUNDLE_PATH = "trained/email_titles_nlp.bundle"
+TFLITE_MODEL_PATH = "trained/email_titles_nlp.tflite"
+TFLITE_INT8_MODEL_PATH = "trained/email_titles_nlp.int8.tflite"
+KERAS_MODEL_PATH = "trained/email_titles_nlp.keras"
+KERAS_TOKENIZER_PATH = "trained/tv_layer.pkl"
+
+# Title classifier backend -> the files it loads
+TITLE_CLASSIFIER_FILES = {
+    "numpy": [CLASSIFIER_BUNDLE_PATH],
+    "tflite": [TFLITE_MODEL_PATH, KERAS_TOKENIZER_PATH],
+    "tflite-int8": [TFLITE_INT8_MODEL_PATH, KERAS_TOKENIZER_PATH],
+    "keras": [KERAS_MODEL_PATH, KERAS_TOKENIZER_PATH],
+}
+
+# Loaded when the first title that no extractor matches is screened, so runs where the extractor
+# rules decide every message, and the extraction worker processes, never load the model
+tc = None
+
+
+def resolve_title_classifier(backend: str) -> str:
+    """
+    "auto" is the NumPy classifier when its bundle was exported, the Keras model otherwise
+    """
+    if backend == "auto":
+        return "numpy" if os.path.exists(CLASSIFIER_BUNDLE_PATH) else "keras"
+    return backend
+
+
+def get_title_classifier(backend: str = "auto"):
+    global tc
+    if tc is None:
+        start = time.monotonic()
+        backend = resolve_title_classifier(backend)
+        if backend == "numpy":
+            from numpy_title_classifier import NumpyEmailTitleClassifier
+
+            tc = NumpyEmailTitleClassifier(CLASSIFIER_BUNDLE_PATH)
+        elif backend in ("tflite", "tflite-int8"):
+            from tflite_title_classifier import TFLiteEmailTitleClassifier
+
+            tc = TFLiteEmailTitleClassifier(*TITLE_CLASSIFIER_FILES[backend])
         else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "client_secret.json",
-                scopes=["https://www.googleapis.com/auth/gmail.readonly"],
-            )
+            import title_classifier
+
+            tc = title_classifier.EmailTitleClassifier(KERAS_MODEL_PATH, KERAS_TOKENIZER_PATH)
+        print(f"Loaded the {backend} title classifier in {time.monotonic() - start:.2f}s")
+    return tc
 
-            # Run the flow to obtain credentials
-            credentials = flow.run_console()
 
-        # Save the credentials for the next run
-        with open(TOKEN_PICKLE, "wb") as token:
-            pickle.dump(credentials, token)
+def open_verdict_cache(backend: str) -> VerdictCache:
+    """
+    The saved classifier verdicts, if they were made by the model the backend loads.
+    Its files are hashed when the first title is screened, and only if they all exist.
+    """
+    files = TITLE_CLASSIFIER_FILES[resolve_title_classifier(backend)]
+
+    def model_hash() -> str | None:
+        missing = [path for path in files if not os.path.exists(path)]
+        if missing:
+            print(f"Not keeping title classifier verdicts, {', '.join(missing)} not found")
+            return None
+        return "".join(file_hash(path) for path in files)
 
-    return credentials
+    return VerdictCache(model_hash, path=VERDICT_CACHE_PATH)
 
 
-# Convert the credentials to a format that aiogoogle can use
-raw_creds = get_credentials()
-user_creds = UserCreds(
-    access_token=raw_creds.token,
-    refresh_token=raw_creds.refresh_token,
-    token_uri=raw_creds.token_uri,
-    id_token=raw_creds.id_token,
-)
-client_creds = ClientCreds(
-    client_id=raw_creds.client_id, client_secret=raw_creds.client_secret
-)
+def create_title_classifier(backend: str, verdict_cache: bool) -> tuple[BatchingClassifier, VerdictCache | None]:
+    verdicts = open_verdict_cache(backend) if verdict_cache else None
+    return BatchingClassifier(lambda: get_title_classifier(backend), cache=verdicts), verdicts
 
 
-def extract_domain(email):
-    """Extracts the domain name from an email address.
+def get_header(msg: dict, name: str) -> str:
+    headers = msg["payload"]["headers"]
+    return next((header["value"] for header in headers if header["name"] == name), "")
 
-    Args:
-      email: The email address to extract the domain from.
 
-    Returns:
-      The domain name, or None if the email address is invalid.
+def scan_in_progress(journal: ProgressJournal) -> bool:
     """
-    match = re.search(r"@[\w.\-]+", email)
-    if match:
-        return match.group().lstrip("@")
-    return None
+    Whether an earlier full scan of the mailbox stopped before its last page
+    """
+    return journal.get_checkpoint("page_token") is not None or journal.get_checkpoint("page_offset") is not None
 
 
-async def fetch_email_data(gmail, message_id) -> list[TransactionData]:
-    async with Aiogoogle(user_creds=user_creds, client_creds=client_creds) as aiogoogle:
-        try:
-            msg = await aiogoogle.as_user(
-                gmail.users.messages.get(userId="me", id=message_id, format="metadata")
+async def list_message_ids(
+    aiogoogle: Aiogoogle,
+    limiter: GmailQuotaLimiter,
+    gmail,
+    journal: ProgressJournal,
+    limit: int,
+    skip: Callable[[str], bool] = lambda message_id: False,
+):
+    """
+    Yield message IDs page by page, newest first, up to `limit` messages that `skip` lets through.
+    Continues from the page token, and the position within that page, saved in the journal
+    if an earlier scan was interrupted or cut short by the limit.
+    """
+    listed_count = 0
+    page_token = journal.get_checkpoint("page_token")
+    offset = int(journal.get_checkpoint("page_offset") or 0)
+    if scan_in_progress(journal):
+        print("Resuming the mailbox scan from the last saved page")
+
+    while listed_count < limit:
+        response = await limiter.call_with_backoff(
+            "users.messages.list",
+            lambda: aiogoogle.as_user(
+                gmail.users.messages.list(userId="me", maxResults=500, pageToken=page_token)
             )
-            headers = msg["payload"]["headers"]
+        )
 
-            subject = next(
-                (header["value"] for header in headers if header["name"] == "Subject"),
-                "",
-            )
-            from_email = next(
-                (header["value"] for header in headers if header["name"] == "From"), ""
-            )
-            from_domain = extract_domain(from_email)
-            
-            # Check is transaction email or not frome existing extractors
-            is_tx = False
-            
-            for ex in exs:
-                try:
-                    if ex.match(subject, from_email):
-                        is_tx = True
-                        break
-                except Exception as ex:
-                    print(f"Error while matching {subject} from:{from_domain} with {ex}")
-
-            # Classify the email title
-            if not is_tx:
-                [pred_tx] = tc.predict([f"{subject} from:{from_domain}"])
-                is_tx = pred_tx
-                
-            if not is_tx:
-                return []
-
-            full_msg = await aiogoogle.as_user(
-                gmail.users.messages.get(userId="me", id=message_id, format="raw")
+        messages = response.get("messages", [])
+        while offset < len(messages) and listed_count < limit:
+            message_id = messages[offset]["id"]
+            offset += 1
+            if skip(message_id):
+                continue
+            yield message_id
+            listed_count += 1
+
+        if offset < len(messages):
+            # The limit cut this page short, the next run continues after the last message listed from it
+            journal.set_checkpoint("page_offset", str(offset))
+            break
+
+        # Every message of this page is in the journal by now, so a restart can continue after it
+        page_token = response.get("nextPageToken", None)
+        offset = 0
+        journal.set_checkpoint("page_token", page_token)
+        journal.set_checkpoint("page_offset", None)
+        if page_token is None:
+            break
+
+        print(f"Listed {listed_count}/{limit} emails so far...")
+
+
+async def list_history_message_ids(aiogoogle: Aiogoogle, limiter: GmailQuotaLimiter, gmail, start_history_id: str):
+    """
+    Yield the IDs of messages added to the mailbox since `start_history_id`
+    """
+    page_token = None
+
+    while True:
+        response = await limiter.call_with_backoff(
+            "users.history.list",
+            lambda: aiogoogle.as_user(
+                gmail.users.history.list(
+                    userId="me",
+                    startHistoryId=start_history_id,
+                    historyTypes="messageAdded",
+                    pageToken=page_token,
+                )
             )
+        )
 
-            # Try to go through all the extractors
-            trxs = []
-
-            # Load the email content
-            data = parser.parsebytes(base64.urlsafe_b64decode(full_msg["raw"]))
-            content = EmailContent(data)
-            
-            # Extract transactions
-            
-            for ex in exs:
-                try:
-                    if ex.match(content.title, content.from_email):
-                        trxs.extend(ex.extract(content))
-                except Exception as e:
-                    print(f"Error while extracting transactions for {subject} from:{from_domain}: {e}")
-
-            if not trxs:
-                dump_path = f"dumped/{from_domain}-{message_id}.eml"
-                print(
-                    f"No transactions found in {subject} from:{from_domain}. Dumping the message to {dump_path}"
-                )
-                with open(dump_path, "wb") as f:
-                    f.write(base64.urlsafe_b64decode(full_msg["raw"]))
-            return trxs
+        for record in response.get("history", []):
+            for added in record.get("messagesAdded", []):
+                message = added["message"]
+                # messages.list leaves these out by default, so the incremental sync does too
+                if not {"SPAM", "TRASH"}.intersection(message.get("labelIds", [])):
+                    yield message["id"]
+
+        page_token = response.get("nextPageToken", None)
+        if page_token is None:
+            break
+
+
+async def list_new_message_ids(
+    aiogoogle: Aiogoogle, limiter: GmailQuotaLimiter, gmail, journal: ProgressJournal, current_history_id: str, limit: int
+):
+    """
+    Yield the IDs of messages that previous runs have not completed yet, recording each one in the journal.
+
+    Messages left unfinished by an earlier run come first, unless they errored too often. Then the mailbox history
+    since the last checkpoint is listed, so new mail is picked up on every run, and an unfinished full scan continues
+    for up to `limit` more messages. Without a usable checkpoint a full scan is started.
+    """
+    seen = set()
+
+    def skip(message_id: str) -> bool:
+        return message_id in seen or journal.is_settled(message_id)
+
+    for message_id in journal.pending_ids():
+        seen.add(message_id)
+        yield message_id
+
+    # Journals from before the history was synced during a full scan only have the scan's starting point
+    history_id = journal.get_checkpoint("history_id") or journal.get_checkpoint("scan_history_id")
+    if history_id is not None:
+        try:
+            async for message_id in list_history_message_ids(aiogoogle, limiter, gmail, history_id):
+                if skip(message_id):
+                    continue
+                seen.add(message_id)
+                journal.record_listed(message_id)
+                yield message_id
+
+            journal.set_checkpoint("history_id", current_history_id)
+            journal.set_checkpoint("scan_history_id", None)
         except HTTPError as e:
-            if e.res.status_code == 429:
-                print("Rate limit exceeded, waiting...")
-                await asyncio.sleep(random.uniform(1, 3))
-                return await fetch_email_data(gmail, message_id)
-            else:
+            # Gmail only keeps history for a limited time, older IDs are answered with 404
+            if e.res is None or e.res.status_code != 404:
                 raise e
+            print(f"History ID {history_id} has expired, falling back to a full scan")
+            journal.set_checkpoint("page_token", None)
+            journal.set_checkpoint("page_offset", None)
+            history_id = None
+
+    if history_id is None:
+        # A fresh scan covers everything up to now; later mail is picked up from this point in the history
+        journal.set_checkpoint("history_id", current_history_id)
+    elif not scan_in_progress(journal):
+        return
+
+    async for message_id in list_message_ids(aiogoogle, limiter, gmail, journal, limit, skip):
+        seen.add(message_id)
+        journal.record_listed(message_id)
+        yield message_id
+
+
+async def fetch_email_metadata(
+    transport: GmailBatchTransport, journal: ProgressJournal, cache: RawMessageCache, message_ids: list[str]
+) -> list[tuple[str, str, str, bytes | None]]:
+    """
+    Fetch (message ID, subject, sender, raw message) for a batch of messages.
+    Messages in the raw cache are read from there instead, and passed on so that they
+    are read only once; the raw message of the others is None.
+    """
+    results = []
+    to_fetch = []
+    cached = await cache.get_many(message_ids)
+    for message_id in message_ids:
+        raw = cached.get(message_id)
+        if raw is None:
+            to_fetch.append(message_id)
+            continue
+        headers = parser.parsebytes(raw, headersonly=True)
+        results.append((message_id, headers.get("Subject", ""), headers.get("From", ""), raw))
+
+    if not to_fetch:
+        return results
+
+    # Only the Subject and From headers are needed to decide whether to download the full message
+    msgs = await transport.get_messages(
+        to_fetch, format="metadata", metadataHeaders=["Subject", "From"]
+    )
+
+    for message_id in to_fetch:
+        if message_id not in msgs:
+            journal.record(message_id, progress_journal.ERRORED, "metadata fetch failed")
+            continue
+        results.append(
+            (message_id, get_header(msgs[message_id], "Subject"), get_header(msgs[message_id], "From"), None)
+        )
+    return results
 
 
-async def extract_tx(gmail, w: csv.DictWriter, page_token=None):
-    async with Aiogoogle(user_creds=user_creds, client_creds=client_creds) as aiogoogle:
-        response = await aiogoogle.as_user(
-            gmail.users.messages.list(userId="me", maxResults=500, pageToken=page_token)
-        )
+async def screen_email(
+    screener: Screener, journal: ProgressJournal, item: tuple[str, str, str, bytes | None]
+) -> list[tuple[str, bytes | None]]:
+    message_id, subject, from_email, raw = item
+    verdict = await screener.screen(message_id, subject, from_email)
+    if verdict.admitted:
+        return [(message_id, raw)]
 
-        messages = response.get("messages", [])
-        next_page_token = response.get("nextPageToken", None)
-        txs = []
-
-        if not messages:
-            return txs, next_page_token, 0
-
-        chunk_size = 100
-        for i in range(0, len(messages), chunk_size):
-            throttle_start = datetime.datetime.now()
-            
-            chunk = messages[i : i + chunk_size]
-            tasks = [fetch_email_data(gmail, message["id"]) for message in chunk]
-            chunk_txs = await asyncio.gather(*tasks)
-            txs.extend(tx for txs in chunk_txs for tx in txs)
-            
-            # Write to disk
-            for tx in [tx for txs in chunk_txs for tx in txs]:
-                if tx.is_proper():
-                    w.writerow(tx.to_formatted_dict())
-                else:
-                    print(f"Transaction {tx} is not proper")
-
-            sleep_seconds = 1.5 - (datetime.datetime.now() - throttle_start).total_seconds()
-            
-            # Sleep to prevent hitting the rate limit (Gmail API limits to 50 requests per second for message.get)
-            await asyncio.sleep(sleep_seconds if sleep_seconds > 0 else 0)
-
-    return txs, next_page_token, len(messages)
+    # Not a transaction, nothing more to do for this message
+    journal.record(message_id, progress_journal.SKIPPED, verdict.describe())
+    return []
 
 
-async def main():
-    start_time = datetime.datetime.now()
-    with open("email-extract.csv", "w", newline='') as f:
-        fieldnames = ["Datetime", "Merchant Name", "Sub Category", "Category", "Amount", "Currency", "Transaction Type", "Payment Method", "Transaction ID", "Notes"]
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
+async def fetch_email_data(
+    transport: GmailBatchTransport,
+    journal: ProgressJournal,
+    screener: Screener,
+    cache: RawMessageCache,
+    items: list[tuple[str, bytes | None]],
+) -> list[tuple[str, bytes]]:
+    """
+    Get the raw messages for a batch of (message ID, raw message if it was cached)
+    """
+    message_ids = [message_id for message_id, _ in items]
+    raws = {message_id: raw for message_id, raw in items if raw is not None}
+
+    to_fetch = [message_id for message_id in message_ids if message_id not in raws]
+    if to_fetch:
+        full_msgs = await transport.get_messages(to_fetch, format="raw")
+        fetched = {message_id: base64.urlsafe_b64decode(full_msg["raw"]) for message_id, full_msg in full_msgs.items()}
+        await cache.put_many(fetched)
+        raws.update(fetched)
+
+    results = []
+    for message_id in message_ids:
+        if message_id not in raws:
+            journal.record(message_id, progress_journal.ERRORED, "raw fetch failed")
+            screener.record_result(message_id, None)
+            continue
+        results.append((message_id, raws[message_id]))
+    return results
+
+
+async def extract_email(
+    pool: Executor, journal: ProgressJournal, screener: Screener, item: tuple[str, bytes]
+) -> list[tuple[str, list[TransactionData], str | None]]:
+    message_id, raw = item
+    try:
+        # Parsing and extraction are CPU-bound, so they run in a worker process to keep the event loop free
+        trxs = await asyncio.get_running_loop().run_in_executor(pool, extract_email_data, message_id, raw)
+    except Exception as e:
+        print(f"Error while processing message {message_id}: {e}")
+        journal.record(message_id, progress_journal.ERRORED, str(e))
+        screener.record_result(message_id, None)
+        return []
+
+    # Keep which extractor or classifier score let the message through
+    verdict = screener.record_result(message_id, len(trxs))
+    detail = verdict.describe() if verdict else None
+    if not trxs:
+        journal.record(message_id, progress_journal.DUMPED, detail)
+        return []
+    # Recorded as extracted by the write stage, once the transactions are on disk
+    return [(message_id, trxs, detail)]
+
+
+# Number of concurrent workers for each network-bound pipeline stage
+METADATA_WORKERS = 4
+RAW_WORKERS = 4
+
+# Messages screened concurrently, so that the title classifier is given whole batches
+SCREEN_WORKERS = classifier_service.MAX_BATCH_SIZE
+
+# Raw messages are much larger than metadata, so they are fetched in smaller batches
+RAW_BATCH_SIZE = 25
+
+# Number of processes parsing emails and running the extractors
+EXTRACT_PROCESSES = os.cpu_count() or 1
+
+EXTRACT_EXECUTORS = ("process", "thread")
+
+
+def create_extract_pool(kind: str) -> Executor:
+    """
+    Processes run the extractors in parallel, threads avoid pickling messages and results
+    and mostly overlap where lxml and the regex engine release the GIL
+    """
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=EXTRACT_PROCESSES, thread_name_prefix="extract")
+    return ProcessPoolExecutor(max_workers=EXTRACT_PROCESSES)
+
+
+CSV_FIELDNAMES = ["Datetime", "Merchant Name", "Sub Category", "Category", "Amount", "Currency", "Transaction Type", "Payment Method", "Transaction ID", "Notes"]
+
+
+def proper_transactions(trxs: list[TransactionData]) -> list[TransactionData]:
+    """
+    The transactions that have every column. Filtered before deduplication, so that a
+    transaction that is never written can't make a later, proper copy of it a duplicate.
+    """
+    proper = []
+    for tx in trxs:
+        if tx.is_proper():
+            proper.append(tx)
+        else:
+            print(f"Transaction {tx} is not proper")
+    return proper
+
 
-        async with Aiogoogle(user_creds=user_creds, client_creds=client_creds) as aiogoogle:
+def to_rows(trxs: list[TransactionData]) -> list[dict]:
+    return [tx.to_formatted_dict() for tx in trxs]
+
+
+def create_sinks(output_path: str, parquet_dir: str | None, append: bool) -> list[BufferedSink]:
+    """
+    The CSV output, and the Parquet output if a directory is given. The CSV sink comes first.
+    """
+    sinks: list[BufferedSink] = [CsvSink(output_path, CSV_FIELDNAMES, append=append)]
+    if parquet_dir is not None:
+        # Only imported when asked for, so that pyarrow is optional
+        from parquet_sink import ParquetSink
+
+        sinks.append(ParquetSink(parquet_dir, append=append))
+    return sinks
+
+
+async def dedup_transactions(
+    deduper: TransactionDeduplicator, item: tuple[str, list[TransactionData], str | None]
+) -> list[tuple[str, list[TransactionData], str | None]]:
+    message_id, trxs, detail = item
+    # Passed on even when every transaction was a duplicate, so that the message is still completed
+    return [(message_id, deduper.filter(message_id, proper_transactions(trxs)), detail)]
+
+
+async def write_rows(sinks: list[BufferedSink], trxs: list[TransactionData]):
+    rows = to_rows(trxs)
+    for sink in sinks:
+        await sink.write(rows)
+
+
+async def write_transactions(
+    sinks: list[BufferedSink], journal: ProgressJournal, item: tuple[str, list[TransactionData], str | None]
+):
+    message_id, trxs, detail = item
+    rows = to_rows(trxs)
+    # Only complete the message once its rows can't be lost anymore from any output, or a resumed run would skip it
+    unwritten = len(sinks)
+
+    def on_written():
+        nonlocal unwritten
+        unwritten -= 1
+        if unwritten == 0:
+            journal.record(message_id, progress_journal.EXTRACTED, detail)
+
+    for sink in sinks:
+        await sink.write(rows, on_written)
+
+
+async def run_gmail(
+    output_path: str,
+    parquet_dir: str | None,
+    strict_screening: bool,
+    title_classifier_backend: str,
+    extract_executor: str = "process",
+    retry_failed: bool = False,
+    verdict_cache: bool = True,
+):
+    user_creds, client_creds = gmail_client.get_aiogoogle_creds()
+    journal = ProgressJournal(max_attempts=None if retry_failed else progress_journal.MAX_ATTEMPTS)
+    given_up = journal.given_up_count()
+    if given_up:
+        print(
+            f"Skipping {given_up} messages that failed {progress_journal.MAX_ATTEMPTS} times, "
+            "pass --retry-failed to try them again"
+        )
+    classifier, verdicts = create_title_classifier(title_classifier_backend, verdict_cache)
+    screener = Screener(index, classifier, strict=strict_screening)
+
+    # Resumed and incremental runs add to the output of the previous ones
+    append = not journal.is_empty()
+    sinks = create_sinks(output_path, parquet_dir, append)
+    deduper = TransactionDeduplicator(dedup_path(output_path), append)
+    with create_extract_pool(extract_executor) as pool:
+        # One pooled session for the whole run, shared by every fetch
+        async with gmail_client.create_aiogoogle(user_creds, client_creds) as aiogoogle:
             gmail = await aiogoogle.discover("gmail", "v1")
+            limiter = GmailQuotaLimiter()
+            transport = GmailBatchTransport(aiogoogle, limiter)
+            cache = RawMessageCache()
+            await cache.load()
 
             extract_limit = 10000
-            extracted_count = 0
-            next_page_token = None
 
-            while extracted_count < extract_limit:
-                titles, next_page_token, processed_count = await extract_tx(gmail, w, next_page_token)
-                extracted_count += processed_count
+            # Remember where the mailbox is now, before listing, so mail arriving during the run is picked up next time
+            profile = await limiter.call_with_backoff(
+                "users.getProfile", lambda: aiogoogle.as_user(gmail.users.getProfile(userId="me"))
+            )
 
-                if next_page_token is None or extracted_count >= extract_limit:
-                    break
+            # Every step runs concurrently; bounded queues between them provide backpressure
+            pipeline = Pipeline(
+                list_new_message_ids(aiogoogle, limiter, gmail, journal, profile["historyId"], extract_limit),
+                [
+                    Stage(
+                        "metadata",
+                        lambda ids: fetch_email_metadata(transport, journal, cache, ids),
+                        workers=METADATA_WORKERS,
+                        batch_size=transport.batch_size,
+                    ),
+                    Stage("screen", lambda item: screen_email(screener, journal, item), workers=SCREEN_WORKERS),
+                    Stage(
+                        "raw",
+                        lambda items: fetch_email_data(transport, journal, screener, cache, items),
+                        workers=RAW_WORKERS,
+                        batch_size=RAW_BATCH_SIZE,
+                    ),
+                    Stage(
+                        "extract",
+                        lambda item: extract_email(pool, journal, screener, item),
+                        workers=EXTRACT_PROCESSES,
+                    ),
+                    Stage("dedup", lambda item: dedup_transactions(deduper, item)),
+                    Stage("write", lambda item: write_transactions(sinks, journal, item)),
+                ],
+            )
+            try:
+                async with contextlib.AsyncExitStack() as stack:
+                    for sink in sinks:
+                        await stack.enter_async_context(sink)
+                    await pipeline.run()
+            finally:
+                await classifier.close()
+                print(f"Message outcomes so far: {journal.counts()}")
+                print(screener.report())
+                print(classifier.report())
+                if verdicts is not None:
+                    print(verdicts.report())
+                    verdicts.save()
+                print(deduper.report())
+                deduper.close()
+                journal.close()
+
+            print(pipeline.format_metrics())
+            for sink in sinks:
+                print(sink.report())
+            print(f"Raw cache: {cache.hits} hits, {cache.misses} misses")
+
+
+async def screen_raw_email(screener: Screener, item: tuple[str, bytes]) -> list[tuple[str, bytes]]:
+    message_id, raw = item
+    headers = parser.parsebytes(raw, headersonly=True)
+    verdict = await screener.screen(message_id, headers.get("Subject", ""), headers.get("From", ""))
+    if verdict.admitted:
+        return [item]
+    return []
+
+
+async def replay_email(
+    pool: Executor, screener: Screener, item: tuple[str, bytes]
+) -> list[tuple[str, list[TransactionData]]]:
+    message_id, raw = item
+    try:
+        # The messages are already on disk, so there is nothing to dump
+        trxs = await asyncio.get_running_loop().run_in_executor(pool, extract_email_data, message_id, raw, False)
+    except Exception as e:
+        print(f"Error while processing message {message_id}: {e}")
+        screener.record_result(message_id, None)
+        return []
+
+    screener.record_result(message_id, len(trxs))
+    return [(message_id, trxs)] if trxs else []
+
+
+async def dedup_replayed(deduper: TransactionDeduplicator, item: tuple[str, list[TransactionData]]) -> list[list[TransactionData]]:
+    message_id, trxs = item
+    kept = deduper.filter(message_id, proper_transactions(trxs))
+    return [kept] if kept else []
+
+
+async def run_replay(
+    source_path: str,
+    output_path: str,
+    parquet_dir: str | None,
+    strict_screening: bool,
+    title_classifier_backend: str,
+    extract_executor: str = "process",
+    verdict_cache: bool = True,
+):
+    """
+    Run title screening, extraction and CSV output over local messages, without Gmail
+    """
+    classifier, verdicts = create_title_classifier(title_classifier_backend, verdict_cache)
+    screener = Screener(index, classifier, strict=strict_screening)
+    sinks = create_sinks(output_path, parquet_dir, append=False)
+    deduper = TransactionDeduplicator(dedup_path(output_path), append=False)
+    with create_extract_pool(extract_executor) as pool:
+        pipeline = Pipeline(
+            aiter_messages(source_path),
+            [
+                Stage("screen", lambda item: screen_raw_email(screener, item), workers=SCREEN_WORKERS),
+                Stage("extract", lambda item: replay_email(pool, screener, item), workers=EXTRACT_PROCESSES),
+                Stage("dedup", lambda item: dedup_replayed(deduper, item)),
+                Stage("write", lambda trxs: write_rows(sinks, trxs)),
+            ],
+        )
+        try:
+            async with contextlib.AsyncExitStack() as stack:
+                for sink in sinks:
+                    await stack.enter_async_context(sink)
+                await pipeline.run()
+        finally:
+            await classifier.close()
+            if verdicts is not None:
+                verdicts.save()
+            deduper.close()
+
+        print(pipeline.format_metrics())
+        for sink in sinks:
+            print(sink.report())
+        print(screener.report())
+        print(classifier.report())
+        if verdicts is not None:
+            print(verdicts.report())
+        print(deduper.report())
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description="Extract transactions from emails")
+    arg_parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="Process a .eml file, a directory of .eml files (e.g. dumped/ or cache/raw), a Maildir or an mbox file instead of Gmail. No credentials are needed.",
+    )
+    arg_parser.add_argument(
+        "--output",
+        help="CSV file to write (default: email-extract.csv, or email-replay.csv with --replay)",
+    )
+    arg_parser.add_argument(
+        "--parquet",
+        metavar="DIR",
+        help="Also write the transactions as Parquet files partitioned by month to DIR (needs pyarrow), "
+        "for Training_Model/categorization_model.py",
+    )
+    arg_parser.add_argument(
+        "--strict-screening",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Only fetch and extract messages that an extractor matches or the title classifier scores at least 0.5 (default). "
+        "With --no-strict-screening every message is processed and the screening report shows what the gate would have missed.",
+    )
+    arg_parser.add_argument(
+        "--title-classifier",
+        choices=["auto", *TITLE_CLASSIFIER_FILES],
+        default="auto",
+        help="Title classifier backend: numpy (trained/email_titles_nlp.bundle), tflite (trained/email_titles_nlp.tflite, "
+        "for small workers with tflite-runtime), tflite-int8 (trained/email_titles_nlp.int8.tflite, also int8 activations), "
+        "or keras. auto uses numpy when the bundle exists, keras otherwise.",
+    )
+    arg_parser.add_argument(
+        "--verdict-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help=f"Keep title classifier scores in {VERDICT_CACHE_PATH} across runs (default)",
+    )
+    arg_parser.add_argument(
+        "--plaintext-backend",
+        choices=PLAINTEXT_BACKENDS,
+        default="html2text",
+        help="How email HTML is converted to plaintext for the extractors. lxml is several times faster and gives "
+        "near-identical text, but whitespace may differ on some inputs (mostly malformed HTML); "
+        "check it with compare_plaintext.py on your dumped emails first.",
+    )
+    arg_parser.add_argument(
+        "--extract-executor",
+        choices=EXTRACT_EXECUTORS,
+        default="process",
+        help="Run the extractors in worker processes (default) or in threads of this process",
+    )
+    arg_parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help=f"Also retry messages that failed {progress_journal.MAX_ATTEMPTS} times in earlier runs, "
+        "which are skipped otherwise",
+    )
+    args = arg_parser.parse_args()
+    # Before the extraction worker processes start, so they use it too
+    set_plaintext_backend(args.plaintext_backend)
 
-                print(f"Extracted {extracted_count}/{extract_limit} emails so far...")
-                print(f"Time elapsed: {datetime.datetime.now() - start_time} seconds")
+    start_time = datetime.datetime.now()
+    if args.replay:
+        await run_replay(
+            args.replay,
+            args.output or "email-replay.csv",
+            args.parquet,
+            args.strict_screening,
+            args.title_classifier,
+            args.extract_executor,
+            args.verdict_cache,
+        )
+    else:
+        await run_gmail(
+            args.output or "email-extract.csv",
+            args.parquet,
+            args.strict_screening,
+            args.title_classifier,
+            args.extract_executor,
+            args.retry_failed,
+            args.verdict_cache,
+        )
+    print(f"Time elapsed: {datetime.datetime.now() - start_time} seconds")
 
 
-# Run the main function
-asyncio.run(main())
+if __name__ == "__main__":
+    # Run the main function
+    asyncio.run(main())
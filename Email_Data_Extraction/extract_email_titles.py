@@ -1,59 +1,16 @@
 import asyncio
 import datetime
-import os
-import pickle
-import random
 from aiogoogle.client import Aiogoogle
-from aiogoogle.excs import HTTPError
-from aiogoogle.auth.creds import UserCreds, ClientCreds
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 import re
 import json
 
 import pandas as pd
 
-# Initialize InstalledAppFlow with your client secret file
-TOKEN_PICKLE = "token.pickle"
+import gmail_client
+from gmail_batch import GmailBatchTransport
+from rate_limiter import GmailQuotaLimiter
 
-
-def get_credentials():
-    credentials = None
-
-    if os.path.exists(TOKEN_PICKLE):
-        with open(TOKEN_PICKLE, "rb") as token:
-            credentials = pickle.load(token)
-
-    if not credentials or not credentials.valid:
-        if credentials and credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(
-                "client_secret.json",
-                scopes=["https://www.googleapis.com/auth/gmail.readonly"],
-            )
-
-            # Run the flow to obtain credentials
-            credentials = flow.run_console()
-
-        # Save the credentials for the next run
-        with open(TOKEN_PICKLE, "wb") as token:
-            pickle.dump(credentials, token)
-
-    return credentials
-
-
-# Convert the credentials to a format that aiogoogle can use
-raw_creds = get_credentials()
-user_creds = UserCreds(
-    access_token=raw_creds.token,
-    refresh_token=raw_creds.refresh_token,
-    token_uri=raw_creds.token_uri,
-    id_token=raw_creds.id_token,
-)
-client_creds = ClientCreds(
-    client_id=raw_creds.client_id, client_secret=raw_creds.client_secret
-)
+user_creds, client_creds = gmail_client.get_aiogoogle_creds()
 
 
 def extract_domain(email):
@@ -71,54 +28,50 @@ def extract_domain(email):
     return None
 
 
-async def fetch_email_data(gmail, message_id):
-    async with Aiogoogle(user_creds=user_creds, client_creds=client_creds) as aiogoogle:
-        try:
-            msg = await aiogoogle.as_user(
-                gmail.users.messages.get(userId="me", id=message_id, format="metadata")
-            )
-            headers = msg["payload"]["headers"]
-
-            subject = next(
-                (header["value"] for header in headers if header["name"] == "Subject"), ""
-            )
-            from_email = next(
-                (header["value"] for header in headers if header["name"] == "From"), ""
-            )
-            from_domain = extract_domain(from_email)
-    
-            return f"{subject} from:{from_domain}"
-        except HTTPError as e:
-            if e.res.status_code == 429:
-                print("Rate limit exceeded, waiting...")
-                await asyncio.sleep(random.uniform(1, 10))
-                return await fetch_email_data(gmail, message_id)
-            else:
-                raise e
-
-
-async def extract_titles(gmail, page_token=None):
-    async with Aiogoogle(user_creds=user_creds, client_creds=client_creds) as aiogoogle:
-        response = await aiogoogle.as_user(
+def get_header(msg: dict, name: str) -> str:
+    headers = msg["payload"]["headers"]
+    return next((header["value"] for header in headers if header["name"] == name), "")
+
+
+async def fetch_email_data(transport: GmailBatchTransport, message_ids: list[str]):
+    msgs = await transport.get_messages(
+        message_ids, format="metadata", metadataHeaders=["Subject", "From"]
+    )
+
+    titles = []
+    for message_id in message_ids:
+        if message_id not in msgs:
+            continue
+
+        subject = get_header(msgs[message_id], "Subject")
+        from_domain = extract_domain(get_header(msgs[message_id], "From"))
+        titles.append(f"{subject} from:{from_domain}")
+
+    return titles
+
+
+async def extract_titles(aiogoogle: Aiogoogle, transport: GmailBatchTransport, gmail, page_token=None):
+    response = await transport.limiter.call_with_backoff(
+        "users.messages.list",
+        lambda: aiogoogle.as_user(
             gmail.users.messages.list(userId="me", maxResults=500, pageToken=page_token)
         )
+    )
 
-        messages = response.get("messages", [])
-        next_page_token = response.get("nextPageToken", None)
-        titles = []
+    messages = response.get("messages", [])
+    next_page_token = response.get("nextPageToken", None)
 
-        if not messages:
-            return titles, next_page_token
+    if not messages:
+        return [], next_page_token
 
-        chunk_size = 48
-        for i in range(0, len(messages), chunk_size):
-            chunk = messages[i : i + chunk_size]
-            tasks = [fetch_email_data(gmail, message["id"]) for message in chunk]
-            chunk_titles = await asyncio.gather(*tasks)
-            titles.extend(chunk_titles)
-            
-            # Sleep to prevent hitting the rate limit (Gmail API limits to 50 requests per second for message.get)
-            await asyncio.sleep(1)
+    # Each chunk is fetched as a single batch request, paced by the shared quota limiter
+    chunk_size = transport.batch_size
+    tasks = [
+        fetch_email_data(transport, [message["id"] for message in messages[i : i + chunk_size]])
+        for i in range(0, len(messages), chunk_size)
+    ]
+    chunk_titles = await asyncio.gather(*tasks)
+    titles = [title for titles in chunk_titles for title in titles]
 
     return titles, next_page_token
 
@@ -126,8 +79,10 @@ async def extract_titles(gmail, page_token=None):
 async def main():
     start_time = datetime.datetime.now()
     
-    async with Aiogoogle(user_creds=user_creds, client_creds=client_creds) as aiogoogle:
+    # One pooled session for the whole run, shared by every fetch
+    async with gmail_client.create_aiogoogle(user_creds, client_creds) as aiogoogle:
         gmail = await aiogoogle.discover("gmail", "v1")
+        transport = GmailBatchTransport(aiogoogle, GmailQuotaLimiter())
 
         extract_limit = 10000
         extracted_count = 0
@@ -135,7 +90,7 @@ async def main():
         next_page_token = None
 
         while extracted_count < extract_limit:
-            titles, next_page_token = await extract_titles(gmail, next_page_token)
+            titles, next_page_token = await extract_titles(aiogoogle, transport, gmail, next_page_token)
             all_titles.extend(titles)
             extracted_count += len(titles)
 
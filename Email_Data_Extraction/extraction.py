@@ -0,0 +1,116 @@
+import re
+
+import email
+import email.parser
+import email.message
+import email.policy
+
+from extractors.tokopedia import TokopediaExtractor
+from extractors.grabfood import GrabFoodExtractor
+from extractors.gotagihan import GoTagihanExtractor
+from extractors.google_play import GooglePlayExtractor
+from extractors.grab import GrabExtractor
+from extractors.itemku import ItemkuExtractor
+from extractors.jago import JagoExtractor
+from extractors.mobapay import MobaPayExtractor
+from extractors.mybca import MyBCAExtrator
+from extractors.ocbc import OCBCExtractor
+from extractors.ovo import OVOExtractor
+from extractors.paypal import PaypalExtractor
+from extractors.seabank import SeaBankExtractor
+from extractors.steam import SteamExtractor
+from extractors.unipin import UniPinExtractor
+from extractors.xsolla import XsollaExtractor
+from extractors.gofood import GoFoodExtractor
+from extractors.base_extractor import BaseExtractor, EmailContent, TransactionData
+from extractors.bri import BRIExtractor
+from extractors.eg import EGExtractor
+from extractors.livin import MandiriExtractor
+from extractors.dispatch import ExtractorIndex
+
+parser = email.parser.BytesParser(
+    email.message.EmailMessage, policy=email.policy.default
+)
+
+
+def create_extractors() -> list[BaseExtractor]:
+    return [
+        BRIExtractor(),
+        EGExtractor(),
+        GoFoodExtractor(),
+        GooglePlayExtractor(),
+        GrabExtractor(),
+        ItemkuExtractor(),
+        JagoExtractor(),
+        UniPinExtractor(),
+        MobaPayExtractor(),
+        MyBCAExtrator(),
+        OCBCExtractor(),
+        OVOExtractor(),
+        PaypalExtractor(),
+        SeaBankExtractor(),
+        SteamExtractor(),
+        XsollaExtractor(),
+        GoTagihanExtractor(),
+        GrabFoodExtractor(),
+        TokopediaExtractor(),
+        MandiriExtractor()
+    ]
+
+
+# Built once per process, including every extraction worker process
+exs: list[BaseExtractor] = create_extractors()
+
+# Finds the extractors for an email by its sender
+index = ExtractorIndex(exs)
+
+
+def extract_domain(email):
+    """Extracts the domain name from an email address.
+
+    Args:
+      email: The email address to extract the domain from.
+
+    Returns:
+      The domain name, or None if the email address is invalid.
+    """
+    match = re.search(r"@[\w.\-]+", email)
+    if match:
+        return match.group().lstrip("@")
+    return None
+
+
+def extract_email_data(message_id: str, raw: bytes, dump: bool = True) -> list[TransactionData]:
+    """
+    Parse a raw message and run every matching extractor on it.
+    Messages without transactions are dumped to `dumped/` unless `dump` is False.
+
+    This is CPU-bound and picklable, so it can run in a worker process.
+    """
+    # Try to go through all the extractors
+    trxs = []
+
+    # Load the email content
+    data = parser.parsebytes(raw)
+    content = EmailContent(data)
+    subject = content.title
+    from_domain = extract_domain(content.from_email)
+
+    # Extract transactions
+
+    for ex in index.match(content.title, content.from_email):
+        try:
+            for trx in ex.extract(content):
+                trx.source = type(ex).__name__
+                trxs.append(trx)
+        except Exception as e:
+            print(f"Error while extracting transactions for {subject} from:{from_domain}: {e}")
+
+    if not trxs and dump:
+        dump_path = f"dumped/{from_domain}-{message_id}.eml"
+        print(
+            f"No transactions found in {subject} from:{from_domain}. Dumping the message to {dump_path}"
+        )
+        with open(dump_path, "wb") as f:
+            f.write(raw)
+    return trxs
@@ -3,6 +3,8 @@ from datetime import datetime
 from decimal import Decimal
 from enum import Enum
 from io import StringIO
+import re
+import time
 import pandas as pd
 from collections import defaultdict
 
@@ -10,10 +12,13 @@ import email
 import email.parser
 import email.message
 import email.policy
-import html2text
 import email.utils
 import string
-from typing import Any
+from typing import Any, Callable
+
+from .plaintext import html_to_plaintext
+from .tables import HtmlTables
+from .rules import TitleRule
 
 def to_ascii(s: Any) -> str:
     return str(s).encode("ascii", errors="ignore").decode()
@@ -31,6 +36,9 @@ class TransactionData:
     is_incoming: bool
     description: str
 
+    # Name of the extractor class that produced it, set by extract_email_data
+    source: str
+
     def __str__(self):
         s = self.__class__.__name__ + "("
         for k, v in self.__dict__.items():
@@ -58,24 +66,18 @@ class TransactionData:
             "Notes": to_ascii(self.description),
         }
 
-h = html2text.HTML2Text()
-h.ignore_links = True
-h.ignore_emphasis = True
-h.ignore_mailto_links = True
-h.ignore_images = True
-h.ignore_tables = True
+_WHITESPACE = re.compile(r"\s+")
 
-class EmailContent:
+# Marks a view that wasn't computed yet, as an empty string or list is a valid result
+_UNSET = object()
 
-    # Plaintext / markdown-formatted
-    _md_str: str | None = None
+class EmailContent:
+    """
+    An email and views of its body, each computed once on first use: the decoded body
+    (`get_html`), plaintext, whitespace-normalized plaintext and tables, the latter once per
+    set of options. The time spent computing each view is kept in `timings`.
+    """
 
-    # As list of Pandas DataFrame
-    _dfs: list[pd.DataFrame] | None = None
-    
-    # As HTML
-    _html: str | None = None
-    
     # Raw email message
     email_message: email.message.EmailMessage
 
@@ -84,6 +86,20 @@ class EmailContent:
         self.from_email: str = email.utils.parseaddr(message.get("from", "Unknown Sender <unknown@unknown.com>"))[1]
         self.email_message = message
 
+        # View name -> value
+        self._views: dict[str, Any] = {}
+        # View name -> seconds spent computing it, not counting the views it is derived from
+        self.timings: dict[str, float] = {}
+
+    def _view(self, name: str, compute: Callable[[], Any]) -> Any:
+        value = self._views.get(name, _UNSET)
+        if value is _UNSET:
+            start = time.perf_counter()
+            value = compute()
+            self.timings[name] = time.perf_counter() - start
+            self._views[name] = value
+        return value
+
     def _get_content(self) -> str:
         body = self.email_message.get_body()
         if not body:
@@ -95,26 +111,38 @@ class EmailContent:
         """
         Obtain formatted as HTML
         """
-        if not self._html:
-            self._html = self._get_content()
-        return self._html
+        return self._view("html", self._get_content)
 
     def get_plaintext(self) -> str:
         """
         Obtain formatted as plaintext
         """
-        if not self._md_str:
-            self._md_str = h.handle(self._get_content())
-        return self._md_str
+        html = self.get_html()
+        return self._view("plaintext", lambda: html_to_plaintext(html))
+
+    def get_normalized_plaintext(self) -> str:
+        """
+        Obtain formatted as plaintext, with every run of whitespace (including newlines) replaced by one space
+        """
+        plaintext = self.get_plaintext()
+        return self._view("normalized_plaintext", lambda: _WHITESPACE.sub(" ", plaintext))
+
+    def get_tables(self, displayed_only: bool = True) -> HtmlTables:
+        """
+        Obtain HTML tables as text, by index (the same as `get_dfs`) or by CSS selector.
+        Only the tables that are used are read, prefer this over `get_dfs`.
+        """
+        html = self.get_html()
+        return self._view(f"tables(displayed_only={displayed_only})", lambda: HtmlTables(html, displayed_only))
 
     def get_dfs(self, **kwargs) -> list[pd.DataFrame]:
         """
         Obtain HTML tables formatted as a list of Pandas DataFrame
         """
-        if not self._dfs:
-            # Refuse to parse numbers, as thousands separators can be really different in different locales
-            self._dfs = pd.read_html(StringIO(self.get_html()), **kwargs) # type: ignore
-        return self._dfs
+        html = self.get_html()
+        # Every set of options is parsed on its own, as they change how numbers are read
+        options = ", ".join(f"{name}={value!r}" for name, value in sorted(kwargs.items()))
+        return self._view(f"dfs({options})", lambda: pd.read_html(StringIO(html), **kwargs)) # type: ignore
 
     def __str__(self):
         return f"EmailContent(title={self.title}, from_email={self.from_email})"
@@ -124,12 +152,29 @@ class EmailContent:
 
 
 class BaseExtractor:
-    @abstractmethod
+    # Sender addresses this extractor handles, used to index extractors by sender.
+    # Leave both empty for extractors that may match mail from any sender.
+    senders: tuple[str, ...] = ()
+
+    # Sender domains this extractor handles, for senders using many addresses
+    sender_domains: tuple[str, ...] = ()
+
+    # The email matches if its title passes any of these rules (or if there are none)
+    title_rules: tuple[TitleRule, ...] = ()
+
     def match(self, title: str, email_from: str) -> bool:
         """
-        Test if the email matches the extractor
+        Test if the email matches the extractor's declared senders and title rules.
+        Only override this for conditions that can't be declared; ExtractorIndex then has to call it.
         """
-        pass
+        if self.senders or self.sender_domains:
+            address = email.utils.parseaddr(email_from)[1].lower()
+            if (
+                address not in (sender.lower() for sender in self.senders)
+                and address.rpartition("@")[2] not in (domain.lower() for domain in self.sender_domains)
+            ):
+                return False
+        return not self.title_rules or any(rule.test(title) for rule in self.title_rules)
 
     @abstractmethod
     def extract(self, content: EmailContent) -> list[TransactionData]:
@@ -2,22 +2,17 @@ import re
 from datetime import datetime
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_equals, title_startswith
 
 class BRIExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the BRI format.
-        """
-        return title == "Top Up" or "Pembelian" or "Pembayaran" or "Pemindahan" and email_from == "BankBRI@bri.co.id"
-    
+    senders = ("BankBRI@bri.co.id",)
+    title_rules = title_equals("Top Up") + title_startswith("Pembelian", "Pembayaran", "Pemindahan")
+
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract the transaction data from the BRI email.
         """
-        email = content.get_plaintext()
-
-        # Clean up email content (replace multiple spaces and newlines with a single space)
-        email = re.sub(r"\s+", " ", email)
+        email = content.get_normalized_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
@@ -0,0 +1,93 @@
+import email.utils
+from .base_extractor import BaseExtractor
+from .rules import CompiledRules
+
+
+def parse_sender(email_from: str) -> tuple[str, str]:
+    """
+    Return the lowercased (address, domain) of a From header or bare address
+    """
+    address = email.utils.parseaddr(email_from)[1].lower()
+    return address, address.rpartition("@")[2]
+
+
+class ExtractorIndex:
+    """
+    Look up the extractors that may handle an email from its sender, instead of asking every extractor.
+
+    Extractors are indexed by their declared `senders` and `sender_domains`. Extractors
+    that declare neither are candidates for every email. The title rules of each set of
+    candidates are compiled once into a single regular expression, so matching an email
+    takes two dict lookups and one regex match.
+    """
+
+    def __init__(self, extractors: list[BaseExtractor]):
+        self.extractors: list[BaseExtractor] = []
+        self.by_address: dict[str, list[BaseExtractor]] = {}
+        self.by_domain: dict[str, list[BaseExtractor]] = {}
+        self.any_sender: list[BaseExtractor] = []
+        self._order: dict[int, int] = {}
+
+        # Candidate extractors (by registration order) -> their compiled title rules
+        self._compiled: dict[tuple[int, ...], CompiledRules] = {}
+
+        seen = set()
+        for ex in extractors:
+            # One instance per extractor class is enough
+            if type(ex) in seen:
+                continue
+            seen.add(type(ex))
+            self._order[id(ex)] = len(self.extractors)
+            self.extractors.append(ex)
+
+            for address in ex.senders:
+                self.by_address.setdefault(address.lower(), []).append(ex)
+            for domain in ex.sender_domains:
+                self.by_domain.setdefault(domain.lower(), []).append(ex)
+            if not ex.senders and not ex.sender_domains:
+                self.any_sender.append(ex)
+
+    def candidates(self, email_from: str) -> list[BaseExtractor]:
+        """
+        Extractors that may handle mail from this sender, in registration order
+        """
+        address, domain = parse_sender(email_from)
+        found = self.by_address.get(address, []) + self.by_domain.get(domain, []) + self.any_sender
+        if len(found) <= 1:
+            return found
+        return sorted(dict.fromkeys(found), key=lambda ex: self._order[id(ex)])
+
+    def _rules_for(self, candidates: list[BaseExtractor]) -> CompiledRules:
+        key = tuple(self._order[id(ex)] for ex in candidates)
+        rules = self._compiled.get(key)
+        if rules is None:
+            # Extractors overriding `match` are not described by their rules and are called instead
+            declared = [ex for ex in candidates if type(ex).match is BaseExtractor.match]
+            rules = self._compiled[key] = CompiledRules(declared)
+        return rules
+
+    def match(self, title: str, email_from: str) -> list[BaseExtractor]:
+        """
+        Extractors that accept this email, in registration order.
+        Extractors overriding `match` are given the bare sender address.
+        """
+        candidates = self.candidates(email_from)
+        if not candidates:
+            return []
+
+        fired = self._rules_for(candidates).fired(title)
+        if len(fired) == len(candidates):
+            return fired
+
+        address = email.utils.parseaddr(email_from)[1]
+        matched = []
+        for ex in candidates:
+            if ex in fired:
+                matched.append(ex)
+            elif type(ex).match is not BaseExtractor.match:
+                try:
+                    if ex.match(title, address):
+                        matched.append(ex)
+                except Exception as e:
+                    print(f"Error while matching {title} from:{address} with {type(ex).__name__}: {e}")
+        return matched
@@ -2,14 +2,12 @@ import re
 from decimal import Decimal
 from datetime import datetime
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_startswith
 
 class EGExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the EG transaction receipt format.
-        """
-        return title.startswith("Your Epic Games Receipt ") and email_from == "help@accts.epicgames.com" 
-    
+    senders = ("help@accts.epicgames.com",)
+    title_rules = title_startswith("Your Epic Games Receipt ")
+
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract the transaction data from the email.
@@ -1,26 +1,15 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 
 
 class GoFoodExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        valid_titles = ["your food order with gojek", "pesanan makananmu bersama gojek"]
-        valid_emails = [
-            "no-reply@invoicing.gojek.com"
-            # "m320b4ky1551@bangkit.academy"
-        ]
-        is_title_valid = any(
-            valid_title in title.lower() for valid_title in valid_titles
-        )
-        is_email_valid = any(
-            valid_email in email_from.lower() for valid_email in valid_emails
-        )
-
-        return is_title_valid and is_email_valid
-
-        # return "your food order" in title.lower() and "no-reply@invoicing.gojek.com" in email_from.lower()
+    senders = ("no-reply@invoicing.gojek.com",)
+    title_rules = title_contains(
+        "your food order with gojek", "pesanan makananmu bersama gojek", ignore_case=True
+    )
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         email = content.get_plaintext()
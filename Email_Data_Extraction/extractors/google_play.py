@@ -1,15 +1,13 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 
 
 class GooglePlayExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        return (
-            "google play order receipt" in title.lower()
-            and "googleplay-noreply@google.com" in email_from.lower()
-        )
+    senders = ("googleplay-noreply@google.com",)
+    title_rules = title_contains("google play order receipt", ignore_case=True)
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         email = content.get_plaintext()
@@ -4,19 +4,18 @@ import re
 import datetime
 
 class GoTagihanExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        return email_from == "receipts@gotagihan.gojek.com"
+    senders = ("receipts@gotagihan.gojek.com",)
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
-        c = content.get_dfs(thousands=".", decimal=",")
+        tables = content.get_tables()
         pt = content.get_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
         trx.payment_method = "GoPay"
 
-        trx.merchant = str(c[1].loc[0][1])
-        merged_amount = str(c[1].loc[0][2])
+        trx.merchant = tables[1].cell(0, 1)
+        merged_amount = tables[1].cell(0, 2)
         
         # For currency, split before first number
         first_num_idx = re.search(r"\d", merged_amount).start()
@@ -27,7 +26,7 @@ class GoTagihanExtractor(BaseExtractor):
         trx.description = ""
         try:
             trx.date = datetime.datetime.strptime(
-                str(c[0].loc[0][1]),
+                tables[0].cell(0, 1),
                 "%d %b %Y, %H:%M",
             )
         except ValueError:
@@ -1,11 +1,12 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_equals
 import re
 import datetime
 
 class GrabFoodExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        return title == "Your Grab E-Receipt" and email_from == "no-reply@grab.com"
+    senders = ("no-reply@grab.com",)
+    title_rules = title_equals("Your Grab E-Receipt")
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         pt = content.get_plaintext()
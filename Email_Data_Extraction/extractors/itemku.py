@@ -1,17 +1,14 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains_all
 import re
 import datetime
 import locale
 
 
 class ItemkuExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        return (
-            "pembayaran pesanan" in title.lower()
-            and "telah kami terima" in title.lower()
-            and "no-reply@itemku.com" in email_from.lower()
-        )
+    senders = ("no-reply@itemku.com",)
+    title_rules = title_contains_all("pembayaran pesanan", "telah kami terima", ignore_case=True)
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         email = content.get_plaintext()
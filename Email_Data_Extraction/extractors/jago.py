@@ -1,27 +1,13 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 
 
 class JagoExtractor(BaseExtractor):
-    # def match(self, title: str, email_from: str) -> bool:
-    #     return (
-    #     "kamu telah membayar" in title.lower() and
-    #     "noreply@jago.com" in email_from.lower()
-    # )
-
-    def match(self, title: str, email_from: str) -> bool:
-        valid_titles = ["kamu telah membayar"]
-        valid_emails = ["noreply@jago.com", "tanya@jago.com"]
-        is_title_valid = any(
-            valid_title in title.lower() for valid_title in valid_titles
-        )
-        is_email_valid = any(
-            valid_email in email_from.lower() for valid_email in valid_emails
-        )
-
-        return is_title_valid and is_email_valid
+    senders = ("noreply@jago.com", "tanya@jago.com")
+    title_rules = title_contains("kamu telah membayar", ignore_case=True)
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         email = content.get_plaintext()
@@ -1,26 +1,15 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 
 
 class MandiriExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        # return (
-        #     ("transfer berhasil" in title.lower() or "top-up berhasil" in title.lower())
-        #     and email_from == "m320b4ky1551@bangkit.academy"
-        # )
-
-        valid_titles = ["transfer berhasil", "top-up berhasil", "pembayaran berhasil"]
-        valid_emails = ["noreply.livin@bankmandiri.co.id"]
-        is_title_valid = any(
-            valid_title in title.lower() for valid_title in valid_titles
-        )
-        is_email_valid = any(
-            valid_email in email_from.lower() for valid_email in valid_emails
-        )
-
-        return is_title_valid and is_email_valid
+    senders = ("noreply.livin@bankmandiri.co.id",)
+    title_rules = title_contains(
+        "transfer berhasil", "top-up berhasil", "pembayaran berhasil", ignore_case=True
+    )
 
     def extract_transfer(self, content: EmailContent) -> list[TransactionData]:
         email = content
@@ -2,22 +2,17 @@ import re
 from decimal import Decimal
 import datetime
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 
 class MobaPayExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the Mobapay payment confirmation format.
-        """
-        return "Payment Successful" in title and "mobapay@mail.mobapay.com" in email_from
-    
+    senders = ("mobapay@mail.mobapay.com",)
+    title_rules = title_contains("Payment Successful")
+
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract the transaction data from the email.
         """
-        email = content.get_plaintext()
-
-        # Clean up email content (replace multiple spaces and newlines with a single space)
-        email = re.sub(r"\s+", " ", email)
+        email = content.get_normalized_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
@@ -1,12 +1,13 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_equals
 import re
 import datetime
 
 
 class MyBCAExtrator(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        return title == "Internet Transaction Journal" and email_from == "bca@bca.co.id"
+    senders = ("bca@bca.co.id",)
+    title_rules = title_equals("Internet Transaction Journal")
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         email = content.get_plaintext()
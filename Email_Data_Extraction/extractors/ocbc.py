@@ -4,23 +4,22 @@ from typing import Optional
 from datetime import datetime
 import datetime
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_endswith, title_startswith
 
 class OCBCExtractor(BaseExtractor):
-
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the OCBC payment receipt format.
-        """
-        return (title.endswith("Transfer Dana Masuk") or title.startswith("Successful Payment ") or title.startswith("Successful QR Payment ") or title.startswith("Pembayaran QR Berhasil ") or title.startswith("Successful Funds Transfer ")) and (email_from == "onlinetransaction@ocbc.id" or email_from == "notifikasi@ocbc.id" or email_from == "notifikasi@ocbcnisp.com") 
+    senders = ("onlinetransaction@ocbc.id", "notifikasi@ocbc.id", "notifikasi@ocbcnisp.com")
+    title_rules = title_endswith("Transfer Dana Masuk") + title_startswith(
+        "Successful Payment ",
+        "Successful QR Payment ",
+        "Pembayaran QR Berhasil ",
+        "Successful Funds Transfer ",
+    )
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract transactions from the OCBC email content.
         """
-        email = content.get_plaintext()
-
-        # Normalize whitespace
-        email = re.sub(r"\s+", " ", email)
+        email = content.get_normalized_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
@@ -2,22 +2,17 @@ import re
 from decimal import Decimal
 from datetime import datetime
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_equals
 
 class OVOExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the OVO payment confirmation format.
-        """
-        return title == "OVO QR Payment Receipt" and email_from == "noreply@ovo.co.id"
-    
+    senders = ("noreply@ovo.co.id",)
+    title_rules = title_equals("OVO QR Payment Receipt")
+
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract the transaction data from the email.
         """
-        email = content.get_plaintext()
-
-        # Clean up email content (replace multiple spaces and newlines with a single space)
-        email = re.sub(r"\s+", " ", email)
+        email = content.get_normalized_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
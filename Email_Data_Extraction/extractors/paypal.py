@@ -1,31 +1,22 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 import locale
 
 
 class PaypalExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        valid_titles = [
-            "anda mengirim pembayaran",
-            "anda telah menerima",
-            "you've received",
-            "you sent a payment",
-            "you have received",
-            "receipt for your payment",
-        ]
-        valid_emails = ["service@intl.paypal.com"]
-        is_title_valid = any(
-            valid_title in title.lower() for valid_title in valid_titles
-        )
-        is_email_valid = any(
-            valid_email in email_from.lower() for valid_email in valid_emails
-        )
-
-        return is_title_valid and is_email_valid
-
-        # return "Paypal" in title.lower() and "service@intl.paypal.com" in email_from.lower()
+    senders = ("service@intl.paypal.com",)
+    title_rules = title_contains(
+        "anda mengirim pembayaran",
+        "anda telah menerima",
+        "you've received",
+        "you sent a payment",
+        "you have received",
+        "receipt for your payment",
+        ignore_case=True,
+    )
 
     def extractPembayaran(self, content: EmailContent) -> list[TransactionData]:
         email = content
@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+
+import html2text
+from html2text.utils import pad_tables_in_text
+from lxml import etree
+
+PLAINTEXT_BACKENDS = ("html2text", "lxml")
+
+# Read from the environment so that extraction worker processes use the backend of the main process
+PLAINTEXT_BACKEND_ENV = "PLAINTEXT_BACKEND"
+
+# Entity and character references as html.parser finds them: the ";" is optional.
+# Replaced in attribute values as well, which html2text only reads for links and images.
+_ENTITY = re.compile(r"&(#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][-.a-zA-Z0-9]*);?")
+
+# Stand-ins for entities in the text given to lxml, from the Supplementary Private Use Area-A
+_MARK_BASE = 0xF0000
+_MARK = re.compile("([\U000f0000-\U000fffff])")
+
+# lxml drops everything after these, html.parser (and so html2text) carries on
+_DOCUMENT_END = re.compile(r"</\s*(?:html|body)\s*>", re.IGNORECASE)
+
+# Tags that html2text does nothing with, other than noting the current tag, with the
+# options set by create_converter. Most tags of receipt emails are among them.
+_INERT_TAGS = frozenset(
+    ["span", "font", "center", "table", "tbody", "thead", "tfoot", "td", "th", "a", "img", "em", "i", "u", "strong", "b"]
+)
+
+
+class LxmlHTML2Text(html2text.HTML2Text):
+    """
+    html2text's conversion, with the HTML parsed by lxml instead of the pure-Python html.parser.
+
+    The parsed tree is replayed as start tag, data and end tag events into the unchanged
+    html2text handlers, so the output keeps the same line structure ("####" headings,
+    "  \\n" line breaks, wrapping). Entities are passed on the way html.parser would, as
+    html2text converts and escapes them differently from plain text.
+
+    The output is near-identical, not identical: whitespace and line breaks can differ where
+    lxml repairs broken HTML differently, e.g. unclosed table rows get an end tag, and a link
+    inside a link or a list inside a paragraph is closed early. Text without tags is
+    converted by html2text itself.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # lxml parsers can't be shared between threads, and neither can converters
+        self._parser = etree.HTMLParser(remove_comments=True, remove_pis=True)
+
+    def handle(self, data: str) -> str:
+        if "<" not in data or _MARK.search(data):
+            return super().handle(data)
+
+        entities: list[str] = []
+        marks: dict[str, int] = {}
+
+        def mark(match: re.Match) -> str:
+            name = match.group(1)
+            text = self.charref(name[1:]) if name[0] == "#" else self.entityref(name)
+            if text not in marks:
+                marks[text] = len(entities)
+                entities.append(text)
+            return chr(_MARK_BASE + marks[text])
+
+        try:
+            root = etree.fromstring(_ENTITY.sub(mark, _DOCUMENT_END.sub("", data)), self._parser)
+        except (ValueError, etree.ParserError):
+            root = None
+        if root is None:
+            return super().handle(data)
+
+        inert = _INERT_TAGS if self._inert_tags_apply() else frozenset()
+        self.start = True
+        for event, element in etree.iterwalk(root, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag in inert:
+                    self.current_tag = tag
+                else:
+                    self.handle_tag(tag, dict(element.attrib), start=True)
+                if element.text:
+                    self._replay_data(element.text, entities)
+            else:
+                if tag in inert:
+                    self.current_tag = tag
+                else:
+                    self.handle_tag(tag, {}, start=False)
+                if element.tail:
+                    self._replay_data(element.tail, entities)
+
+        markdown = self.optwrap(self.finish())
+        if self.pad_tables:
+            return pad_tables_in_text(markdown)
+        return markdown
+
+    def _inert_tags_apply(self) -> bool:
+        return (
+            self.ignore_links
+            and self.ignore_emphasis
+            and self.ignore_images
+            and self.ignore_tables
+            and not self.google_doc
+            and self.tag_callback is None
+        )
+
+    def _replay_data(self, text: str, entities: list[str]):
+        if text.isspace() and not (
+            self.stressed
+            or self.preceding_stressed
+            or self.style
+            or self.pre
+            or self.google_doc
+            or self.abbr_data is not None
+            or self.maybe_automatic_link is not None
+        ):
+            # The indentation between tags: all that handle_data would do with it
+            self.preceding_data = text
+            if not self.quiet:
+                self.space = True
+            return
+        if not _MARK.search(text):
+            self.handle_data(text)
+            return
+        for i, part in enumerate(_MARK.split(text)):
+            if i % 2:
+                self.handle_data(entities[ord(part) - _MARK_BASE], True)
+            elif part:
+                self.handle_data(part)
+
+
+def check_backend(backend: str):
+    if backend not in PLAINTEXT_BACKENDS:
+        raise ValueError(f"Unknown plaintext backend {backend}, expected one of {', '.join(PLAINTEXT_BACKENDS)}")
+
+
+def create_converter(backend: str) -> html2text.HTML2Text:
+    check_backend(backend)
+    converter = LxmlHTML2Text() if backend == "lxml" else html2text.HTML2Text()
+
+    converter.ignore_links = True
+    converter.ignore_emphasis = True
+    converter.ignore_mailto_links = True
+    converter.ignore_images = True
+    converter.ignore_tables = True
+    return converter
+
+
+_backend = os.environ.get(PLAINTEXT_BACKEND_ENV, "html2text")
+check_backend(_backend)
+
+# Converters keep parser state while they work, so every thread has its own
+_local = threading.local()
+
+
+def set_plaintext_backend(backend: str):
+    """
+    Convert HTML with `backend` from now on, here and in extraction worker processes started later
+    """
+    global _backend
+    check_backend(backend)
+    _backend = backend
+    os.environ[PLAINTEXT_BACKEND_ENV] = backend
+
+
+def get_converter() -> html2text.HTML2Text:
+    """
+    The converter of the current thread, for the current backend
+    """
+    converter = getattr(_local, "converter", None)
+    if converter is None or _local.backend != _backend:
+        converter = create_converter(_backend)
+        _local.converter = converter
+        _local.backend = _backend
+    return converter
+
+
+def html_to_plaintext(html: str) -> str:
+    return get_converter().handle(html)
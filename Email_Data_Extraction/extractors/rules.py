@@ -0,0 +1,110 @@
+import re
+from typing import Any, Iterable
+
+EQUALS = "equals"
+STARTSWITH = "startswith"
+ENDSWITH = "endswith"
+CONTAINS = "contains"
+CONTAINS_ALL = "contains_all"
+
+
+class TitleRule:
+    """
+    A condition on an email title, declared as data so that it can be compiled.
+
+    `kind` is one of EQUALS, STARTSWITH, ENDSWITH, CONTAINS (any of `texts`, as separate rules)
+    or CONTAINS_ALL (every one of `texts`).
+    """
+
+    def __init__(self, kind: str, *texts: str, ignore_case: bool = False):
+        if kind not in (EQUALS, STARTSWITH, ENDSWITH, CONTAINS, CONTAINS_ALL):
+            raise ValueError(f"Unknown title rule kind: {kind}")
+        if not texts or (kind != CONTAINS_ALL and len(texts) != 1):
+            raise ValueError(f"A {kind} rule takes {'at least' if kind == CONTAINS_ALL else 'exactly'} one text")
+        self.kind = kind
+        self.texts = texts
+        self.ignore_case = ignore_case
+        self._compiled: re.Pattern | None = None
+
+    def pattern(self) -> str:
+        """
+        Regular expression for this rule, to be matched at the start of the title with re.DOTALL
+        """
+        escaped = [re.escape(text) for text in self.texts]
+        if self.kind == EQUALS:
+            pattern = f"{escaped[0]}\\Z"
+        elif self.kind == STARTSWITH:
+            pattern = escaped[0]
+        elif self.kind == ENDSWITH:
+            pattern = f".*{escaped[0]}\\Z"
+        elif self.kind == CONTAINS:
+            pattern = f".*?{escaped[0]}"
+        else:
+            pattern = "".join(f"(?=.*?{text})" for text in escaped)
+
+        return f"(?i:{pattern})" if self.ignore_case else pattern
+
+    def test(self, title: str) -> bool:
+        if self._compiled is None:
+            self._compiled = re.compile(self.pattern(), re.DOTALL)
+        return self._compiled.match(title) is not None
+
+    def __repr__(self):
+        texts = ", ".join(repr(text) for text in self.texts)
+        return f"TitleRule({self.kind}, {texts}{', ignore_case=True' if self.ignore_case else ''})"
+
+
+def title_equals(*texts: str, ignore_case: bool = False) -> tuple[TitleRule, ...]:
+    return tuple(TitleRule(EQUALS, text, ignore_case=ignore_case) for text in texts)
+
+
+def title_startswith(*texts: str, ignore_case: bool = False) -> tuple[TitleRule, ...]:
+    return tuple(TitleRule(STARTSWITH, text, ignore_case=ignore_case) for text in texts)
+
+
+def title_endswith(*texts: str, ignore_case: bool = False) -> tuple[TitleRule, ...]:
+    return tuple(TitleRule(ENDSWITH, text, ignore_case=ignore_case) for text in texts)
+
+
+def title_contains(*texts: str, ignore_case: bool = False) -> tuple[TitleRule, ...]:
+    return tuple(TitleRule(CONTAINS, text, ignore_case=ignore_case) for text in texts)
+
+
+def title_contains_all(*texts: str, ignore_case: bool = False) -> tuple[TitleRule, ...]:
+    return (TitleRule(CONTAINS_ALL, *texts, ignore_case=ignore_case),)
+
+
+class CompiledRules:
+    """
+    The title rules of several extractors, compiled into a single regular expression.
+
+    Each extractor's rules become one optional lookahead with a named group, so a single
+    `re.match` tells which extractors fired. Extractors without title rules always fire.
+    """
+
+    def __init__(self, extractors: Iterable[Any]):
+        self.extractors = list(extractors)
+        self.always: list[Any] = []
+        self._by_group: dict[str, Any] = {}
+
+        parts = []
+        for i, ex in enumerate(self.extractors):
+            if not ex.title_rules:
+                self.always.append(ex)
+                continue
+            group = f"{type(ex).__name__}_{i}"
+            self._by_group[group] = ex
+            alternatives = "|".join(rule.pattern() for rule in ex.title_rules)
+            parts.append(f"(?:(?=(?P<{group}>{alternatives})))?")
+
+        self.regex = re.compile("".join(parts), re.DOTALL) if parts else None
+
+    def fired(self, title: str) -> list[Any]:
+        """
+        Extractors whose title rules accept this title, in the order they were given
+        """
+        fired = set(id(ex) for ex in self.always)
+        if self.regex is not None:
+            groups = self.regex.match(title).groupdict()  # type: ignore
+            fired.update(id(self._by_group[group]) for group, value in groups.items() if value is not None)
+        return [ex for ex in self.extractors if id(ex) in fired]
@@ -1,28 +1,16 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 
 
 class SeaBankExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        valid_titles = ["notifikasi transaksi seabank", "notifikasi transfer seabank"]
-        valid_emails = ["alerts@seabank.co.id"]
-        is_title_valid = any(
-            valid_title in title.lower() for valid_title in valid_titles
-        )
-        is_email_valid = any(
-            valid_email in email_from.lower() for valid_email in valid_emails
-        )
-
-        return is_title_valid and is_email_valid
-
-    #     return (
-    #     "notifikasi transaksi seabank" in title.lower() and
-    #     "alerts@seabank.co.id" in email_from.lower()
-    # )
+    senders = ("alerts@seabank.co.id",)
+    title_rules = title_contains(
+        "notifikasi transaksi seabank", "notifikasi transfer seabank", ignore_case=True
+    )
 
-    # alerts@seabank.co.id
     def extract_instant_payment_transaction(
         self, content: EmailContent
     ) -> list[TransactionData]:
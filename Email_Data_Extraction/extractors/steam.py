@@ -1,16 +1,14 @@
 from decimal import Decimal
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_contains
 import re
 import datetime
 import locale
 
 
 class SteamExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        return (
-            "steam purchase" in title.lower()
-            and "noreply@steampowered.com" in email_from.lower()
-        )
+    senders = ("noreply@steampowered.com",)
+    title_rules = title_contains("steam purchase", ignore_case=True)
 
     def extract(self, content: EmailContent) -> list[TransactionData]:
         email = content.get_plaintext()
@@ -0,0 +1,243 @@
+import re
+from io import StringIO
+
+import lxml.html
+from lxml import etree
+
+# Same whitespace handling as pd.read_html
+_CELL_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+
+def _is_hidden(element) -> bool:
+    return "display:none" in element.get("style", "").replace(" ", "")
+
+
+def _has_text(table) -> bool:
+    """
+    Whether any text inside the table has a character other than a newline,
+    like the default `match=".+"` of pd.read_html
+    """
+    return any(text.strip("\n") for text in table.xpath(".//text()"))
+
+
+def _cell_text(cell) -> str:
+    return _CELL_WHITESPACE.sub(" ", cell.text_content().strip())
+
+
+def _cells(row) -> list:
+    return row.xpath("./td|./th")
+
+
+def _span(cell, name: str) -> int:
+    return int(cell.get(name) or 1)
+
+
+class HtmlTable:
+    """
+    A table of an email's HTML. Its rows are read from the DOM on first use.
+
+    `rows` are the rows of the DataFrame pd.read_html gives for the table, as text: rows of
+    <th> cells at the top (or in <thead>) are the `header` instead, cells spanning several
+    rows or columns are repeated, and short rows are padded with empty cells.
+    Numbers are left as they are written, as their format depends on the sender.
+    """
+
+    def __init__(self, element: etree._Element):
+        self.element = element
+        self._header: list[list[str]] | None = None
+        self._rows: list[list[str]] | None = None
+
+    def _expand(self, rows: list, remainder: list, overflow: bool) -> tuple[list[list[str]], list]:
+        """
+        Text of the rows, with rowspan and colspan cells repeated.
+        `remainder` are the cells spanning into these rows, the cells spanning past them are returned.
+        """
+        texts = []
+        for row in rows:
+            row_texts = []
+            next_remainder = []
+            index = 0
+            for cell in _cells(row):
+                while remainder and remainder[0][0] <= index:
+                    prev_index, prev_text, prev_rowspan = remainder.pop(0)
+                    row_texts.append(prev_text)
+                    if prev_rowspan > 1:
+                        next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+                    index += 1
+
+                text = _cell_text(cell)
+                rowspan = _span(cell, "rowspan")
+                for _ in range(_span(cell, "colspan")):
+                    row_texts.append(text)
+                    if rowspan > 1:
+                        next_remainder.append((index, text, rowspan - 1))
+                    index += 1
+
+            for prev_index, prev_text, prev_rowspan in remainder:
+                row_texts.append(prev_text)
+                if prev_rowspan > 1:
+                    next_remainder.append((prev_index, prev_text, prev_rowspan - 1))
+            texts.append(row_texts)
+            remainder = next_remainder
+
+        if not overflow:
+            while remainder:
+                texts.append([text for _, text, _ in remainder])
+                remainder = [(index, text, rowspan - 1) for index, text, rowspan in remainder if rowspan > 1]
+        return texts, remainder
+
+    def _read(self):
+        table = self.element
+        header_rows = []
+        for thead in table.xpath(".//thead"):
+            header_rows.extend(thead.xpath("./tr"))
+            # A <thead> with cells but no <tr> is read as a row
+            if _cells(thead):
+                header_rows.append(thead)
+        body_rows = table.xpath(".//tbody//tr") + table.xpath("./tr")
+        footer_rows = table.xpath(".//tfoot//tr")
+
+        if not header_rows:
+            while body_rows and all(cell.tag == "th" for cell in _cells(body_rows[0])):
+                header_rows.append(body_rows.pop(0))
+
+        header, remainder = self._expand(header_rows, [], overflow=True)
+        body, remainder = self._expand(body_rows, remainder, overflow=bool(footer_rows))
+        footer, _ = self._expand(footer_rows, remainder, overflow=False)
+
+        # Which of the rows are the header, as pd.read_html tells the DataFrame parser:
+        # of several header rows, only those with text
+        if len(header) > 1:
+            header_lines = [i for i, row in enumerate(header) if any(row)]
+        else:
+            header_lines = list(range(len(header)))
+
+        lines = header + body + footer
+        width = max((len(row) for row in lines), default=0)
+        for row in lines:
+            row += [""] * (width - len(row))
+        if width <= 1:
+            # The parser skips blank lines, before counting header lines. Lines of several
+            # cells never count as blank.
+            lines = [row for row in lines if row and row[0].strip()]
+
+        self._header = [lines[i] for i in header_lines if i < len(lines)]
+        self._rows = lines[header_lines[-1] + 1 :] if header_lines else lines
+
+    @property
+    def header(self) -> list[list[str]]:
+        if self._header is None:
+            self._read()
+        return self._header  # type: ignore
+
+    @property
+    def rows(self) -> list[list[str]]:
+        if self._rows is None:
+            self._read()
+        return self._rows  # type: ignore
+
+    def row(self, index: int) -> list[str]:
+        return self.rows[index]
+
+    def cell(self, row: int, column: int) -> str:
+        return self.rows[row][column]
+
+    def is_empty(self) -> bool:
+        """
+        Whether pd.read_html would skip the table, as it has no rows
+        """
+        if self._rows is None:
+            rows = self.element.xpath(".//thead | .//thead/tr | .//tbody//tr | ./tr | .//tfoot//tr")
+            if any(sum(_span(cell, "colspan") for cell in _cells(row)) > 1 for row in rows):
+                # Rows of several cells always count
+                return False
+        return not self.header and not self.rows
+
+    def text(self) -> str:
+        return _cell_text(self.element)
+
+    def __str__(self):
+        return f"HtmlTable({self.rows[:3]}{'...' if len(self.rows) > 3 else ''})"
+
+    def __repr__(self):
+        return str(self)
+
+
+class HtmlTables:
+    """
+    The tables of an email's HTML, parsed once. `tables[i]` is the table of `pd.read_html(html)[i]`,
+    found without reading the tables after it.
+
+    With `displayed_only`, tables and cells hidden with "display:none" are left out, as pd.read_html does.
+    """
+
+    def __init__(self, html: str, displayed_only: bool = True):
+        parser = lxml.html.HTMLParser(recover=True)
+        root = lxml.html.parse(StringIO(html), parser).getroot()
+        self.root = root
+
+        elements = []
+        if root is not None:
+            for br in root.xpath("*//br"):
+                br.tail = "\n" + (br.tail or "")
+            elements = [table for table in root.xpath("//table") if _has_text(table)]
+            if displayed_only:
+                elements = [table for table in elements if not _is_hidden(table)]
+                for element in root.xpath("//table//style"):
+                    element.drop_tree()
+                for element in root.xpath("//table//*[@style]"):
+                    if _is_hidden(element):
+                        element.drop_tree()
+
+        # Candidate <table> elements, in document order, and their views
+        self._elements = elements
+        self._views: dict[etree._Element, HtmlTable] = {}
+        # Tables found so far, and how many elements were looked at to find them
+        self._tables: list[HtmlTable] = []
+        self._scanned = 0
+
+    def _view(self, element: etree._Element) -> HtmlTable:
+        table = self._views.get(element)
+        if table is None:
+            table = HtmlTable(element)
+            self._views[element] = table
+        return table
+
+    def _scan(self, count: int | None = None):
+        """
+        Find tables until there are `count` of them, or all of them
+        """
+        while self._scanned < len(self._elements) and (count is None or len(self._tables) < count):
+            table = self._view(self._elements[self._scanned])
+            self._scanned += 1
+            if not table.is_empty():
+                self._tables.append(table)
+
+    def __getitem__(self, index: int) -> HtmlTable:
+        self._scan(index + 1 if index >= 0 else None)
+        return self._tables[index]
+
+    def __len__(self) -> int:
+        self._scan()
+        return len(self._tables)
+
+    def __iter__(self):
+        index = 0
+        while True:
+            self._scan(index + 1)
+            if index >= len(self._tables):
+                return
+            yield self._tables[index]
+            index += 1
+
+    def select(self, selector: str) -> list[HtmlTable]:
+        """
+        The tables matching a CSS selector, e.g. "table.receipt" or "#summary table"
+        """
+        from lxml.cssselect import CSSSelector
+
+        if self.root is None:
+            return []
+        candidates = set(self._elements)
+        tables = [self._view(element) for element in CSSSelector(selector)(self.root) if element in candidates]
+        return [table for table in tables if not table.is_empty()]
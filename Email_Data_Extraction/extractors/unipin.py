@@ -2,22 +2,17 @@ import re
 from decimal import Decimal
 import datetime
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_equals
 
 class UniPinExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the UniPin purchase format.
-        """
-        return title == "UniPin :: Success Flash Top Up Transaction" and email_from == "do_not_reply@unipin.com"
-    
+    senders = ("do_not_reply@unipin.com",)
+    title_rules = title_equals("UniPin :: Success Flash Top Up Transaction")
+
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract the transaction data from the email.
         """
-        email = content.get_plaintext()
-
-        # Clean up email content (replace multiple spaces and newlines with a single space)
-        email = re.sub(r"\s+", " ", email)
+        email = content.get_normalized_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
@@ -2,22 +2,17 @@ import re
 from decimal import Decimal
 import datetime
 from .base_extractor import BaseExtractor, EmailContent, TransactionData
+from .rules import title_startswith
 
 class XsollaExtractor(BaseExtractor):
-    def match(self, title: str, email_from: str) -> bool:
-        """
-        Check if the email matches the Xsolla purchase format.
-        """
-        return title.startswith("Your receipt No. ") and email_from == "mailer@xsolla.com"
-    
+    senders = ("mailer@xsolla.com",)
+    title_rules = title_startswith("Your receipt No. ")
+
     def extract(self, content: EmailContent) -> list[TransactionData]:
         """
         Extract the transaction data from the email.
         """
-        email = content.get_plaintext()
-
-        # Clean up email content (replace multiple spaces and newlines with a single space)
-        email = re.sub(r"\s+", " ", email)
+        email = content.get_normalized_plaintext()
 
         trx = TransactionData()
         trx.is_incoming = False
@@ -0,0 +1,136 @@
+import asyncio
+import email
+import email.policy
+import json
+import uuid
+from typing import Any
+from urllib.parse import quote, urlencode
+from aiogoogle.client import Aiogoogle
+from aiogoogle.models import Request
+from rate_limiter import RETRY_STATUSES, GmailQuotaLimiter, backoff_delay
+
+BATCH_URL = "https://gmail.googleapis.com/batch/gmail/v1"
+
+# Gmail refuses batches with more than 100 calls
+MAX_BATCH_SIZE = 100
+
+
+def encode_batch(
+    message_ids: list[str], boundary: str, format: str = "metadata", params: dict | None = None
+) -> str:
+    """
+    Build a multipart/mixed body with one `users.messages.get` call per message ID.
+    Each part gets the index of its message as Content-ID so the responses can be matched back.
+    """
+    query = urlencode({"format": format, **(params or {})}, doseq=True)
+    parts = []
+    for i, message_id in enumerate(message_ids):
+        parts.append(
+            f"--{boundary}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <item-{i}>\r\n"
+            "\r\n"
+            f"GET /gmail/v1/users/me/messages/{quote(message_id)}?{query}\r\n"
+            "\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n")
+    return "".join(parts)
+
+
+def decode_batch(content_type: str, body: str) -> dict[int, tuple[int, Any]]:
+    """
+    Split a multipart/mixed batch response into {item index: (HTTP status, decoded JSON body)}
+    """
+    envelope = email.message_from_string(
+        f"Content-Type: {content_type}\r\n\r\n{body}", policy=email.policy.compat32
+    )
+
+    responses = {}
+    for part in envelope.get_payload():  # type: ignore
+        # Responses are labelled "<response-item-N>" for the request labelled "<item-N>"
+        content_id = part.get("Content-ID", "").strip("<>")
+        index = int(content_id.rsplit("-", 1)[-1])
+
+        http_response = part.get_payload()
+        head, _, payload = http_response.replace("\r\n", "\n").partition("\n\n")
+        status = int(head.split(" ", 2)[1])
+
+        try:
+            data = json.loads(payload) if payload.strip() else None
+        except json.JSONDecodeError:
+            data = payload
+        responses[index] = (status, data)
+
+    return responses
+
+
+class GmailBatchTransport:
+    """
+    Fetch many messages at once by packing `users.messages.get` calls into Gmail batch requests.
+    The requests go through the given Aiogoogle client, so they share its session and credentials,
+    and every call inside a batch is paid for against the shared quota limiter.
+    """
+
+    def __init__(
+        self,
+        aiogoogle: Aiogoogle,
+        limiter: GmailQuotaLimiter,
+        batch_size: int = MAX_BATCH_SIZE,
+        max_retries: int = 5,
+    ):
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+        self.aiogoogle = aiogoogle
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+    async def _send(self, message_ids: list[str], format: str, params: dict) -> dict[int, tuple[int, Any]]:
+        boundary = f"batch_{uuid.uuid4().hex}"
+        request = Request(
+            method="POST",
+            url=BATCH_URL,
+            headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+            data=encode_batch(message_ids, boundary, format, params),
+        )
+        res = await self.limiter.call_with_backoff(
+            "users.messages.get", lambda: self.aiogoogle.as_user(request, full_res=True), len(message_ids)
+        )
+        return decode_batch(res.headers["Content-Type"], res.content)
+
+    async def get_messages(self, message_ids: list[str], format: str = "metadata", **params) -> dict[str, dict]:
+        """
+        Fetch the given messages, returning {message ID: message resource}.
+        Items rejected with 429 or a transient server error are retried in a later batch with
+        exponential backoff; other failures, and items still failing after `max_retries`, are
+        reported and left out.
+        """
+        results = {}
+        pending = list(message_ids)
+
+        for attempt in range(self.max_retries + 1):
+            retryable = []
+            for i in range(0, len(pending), self.batch_size):
+                chunk = pending[i : i + self.batch_size]
+                responses = await self._send(chunk, format, params)
+
+                for index, message_id in enumerate(chunk):
+                    status, data = responses.get(index, (0, None))
+                    if status == 200:
+                        results[message_id] = data
+                    elif status in RETRY_STATUSES:
+                        retryable.append(message_id)
+                    else:
+                        print(f"Failed to fetch message {message_id} (HTTP {status}): {data}")
+
+            if not retryable:
+                break
+
+            pending = retryable
+            if attempt < self.max_retries:
+                print(f"Rate limited or failed transiently for {len(pending)} messages, waiting...")
+                await asyncio.sleep(backoff_delay(attempt))
+        else:
+            print(f"Giving up on {len(pending)} messages after {self.max_retries} retries")
+
+        return results
@@ -0,0 +1,89 @@
+import os
+import pickle
+import aiohttp
+from aiogoogle.client import Aiogoogle
+from aiogoogle.sessions.aiohttp_session import AiohttpSession
+from aiogoogle.auth.creds import UserCreds, ClientCreds
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+
+TOKEN_PICKLE = "token.pickle"
+
+# Maximum number of simultaneous connections kept in the shared pool
+CONNECTION_LIMIT = 100
+
+# Seconds an idle connection is kept open for reuse
+KEEPALIVE_TIMEOUT = 60
+
+
+def get_credentials():
+    credentials = None
+
+    if os.path.exists(TOKEN_PICKLE):
+        with open(TOKEN_PICKLE, "rb") as token:
+            credentials = pickle.load(token)
+
+    if not credentials or not credentials.valid:
+        if credentials and credentials.expired and credentials.refresh_token:
+            credentials.refresh(Request())
+        else:
+            flow = InstalledAppFlow.from_client_secrets_file(
+                "client_secret.json",
+                scopes=["https://www.googleapis.com/auth/gmail.readonly"],
+            )
+
+            # Run the flow to obtain credentials
+            credentials = flow.run_console()
+
+        # Save the credentials for the next run
+        with open(TOKEN_PICKLE, "wb") as token:
+            pickle.dump(credentials, token)
+
+    return credentials
+
+
+def get_aiogoogle_creds() -> tuple[UserCreds, ClientCreds]:
+    """
+    Convert the credentials to a format that aiogoogle can use
+    """
+    raw_creds = get_credentials()
+    user_creds = UserCreds(
+        access_token=raw_creds.token,
+        refresh_token=raw_creds.refresh_token,
+        token_uri=raw_creds.token_uri,
+        id_token=raw_creds.id_token,
+    )
+    client_creds = ClientCreds(
+        client_id=raw_creds.client_id, client_secret=raw_creds.client_secret
+    )
+    return user_creds, client_creds
+
+
+def create_aiogoogle(
+    user_creds: UserCreds,
+    client_creds: ClientCreds,
+    connection_limit: int = CONNECTION_LIMIT,
+    keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+) -> Aiogoogle:
+    """
+    Create an Aiogoogle client backed by a single pooled, keep-alive HTTP session.
+
+    Enter it once with `async with` for the whole run and pass it to every coroutine
+    that talks to Gmail, so requests reuse open connections instead of doing a new
+    TLS handshake each time.
+    """
+
+    def session_factory() -> AiohttpSession:
+        # Called by Aiogoogle.__aenter__, so the connector is created inside the running loop
+        connector = aiohttp.TCPConnector(
+            limit=connection_limit,
+            limit_per_host=connection_limit,
+            keepalive_timeout=keepalive_timeout,
+        )
+        return AiohttpSession(connector=connector)
+
+    return Aiogoogle(
+        session_factory=session_factory,
+        user_creds=user_creds,
+        client_creds=client_creds,
+    )
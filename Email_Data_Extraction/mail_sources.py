@@ -0,0 +1,97 @@
+import asyncio
+import email.parser
+import gzip
+import mailbox
+import os
+from typing import AsyncIterator, Iterator
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EML_EXTENSIONS = (".eml", ".eml.gz", ".eml.zst")
+
+
+def _read_eml(path: str) -> bytes:
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".gz"):
+        return gzip.decompress(data)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _strip_extension(name: str) -> str:
+    for extension in EML_EXTENSIONS:
+        if name.endswith(extension):
+            return name[: -len(extension)]
+    return name
+
+
+def iter_eml_dir(path: str) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield (file name without extension, raw message) for every .eml file below `path`.
+    Compressed files, as written by RawMessageCache, are decompressed.
+    """
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(EML_EXTENSIONS):
+                yield _strip_extension(filename), _read_eml(os.path.join(dirpath, filename))
+
+
+def iter_mbox(path: str) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield (Message-ID or position, raw message) for every message of an mbox file
+    """
+    box = mailbox.mbox(path, create=False)
+    header_parser = email.parser.BytesHeaderParser()
+    try:
+        for key in box.iterkeys():
+            raw = box.get_bytes(key)
+            # Only the headers, the extractors parse the whole message later
+            message_id = header_parser.parsebytes(raw).get("Message-ID", "").strip("<> ")
+            yield message_id or f"mbox-{key}", raw
+    finally:
+        box.close()
+
+
+def iter_maildir(path: str) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield (Maildir key, raw message) for every message of a Maildir
+    """
+    box = mailbox.Maildir(path, factory=None, create=False)
+    for key in sorted(box.iterkeys()):
+        yield key, box.get_bytes(key)
+
+
+def iter_messages(path: str) -> Iterator[tuple[str, bytes]]:
+    """
+    Yield (message ID, raw message) from a single .eml file, a directory of .eml files, a Maildir or an mbox file
+    """
+    if os.path.isdir(path):
+        if all(os.path.isdir(os.path.join(path, sub)) for sub in ("cur", "new", "tmp")):
+            return iter_maildir(path)
+        return iter_eml_dir(path)
+
+    if path.endswith(EML_EXTENSIONS):
+        return iter([(_strip_extension(os.path.basename(path)), _read_eml(path))])
+
+    return iter_mbox(path)
+
+
+async def aiter_messages(path: str) -> AsyncIterator[tuple[str, bytes]]:
+    """
+    Async version of iter_messages, for use as a Pipeline source.
+    Files are read in a thread, so that the event loop keeps running the other stages.
+    """
+    messages = iter_messages(path)
+    while True:
+        item = await asyncio.to_thread(next, messages, None)
+        if item is None:
+            return
+        yield item
@@ -0,0 +1,53 @@
+import numpy as np
+
+from classifier_bundle import load_bundle
+from title_vectorizer import TitleVectorizer
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    # 1 / (1 + exp(-x)), without overflowing for large negative x
+    return np.exp(-np.logaddexp(0, -x))
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": _sigmoid,
+}
+
+
+class NumpyEmailTitleClassifier:
+    """
+    The email title classifier without TensorFlow: the weights and vocabulary exported by
+    export_title_classifier.py are applied with NumPy. Scores match EmailTitleClassifier.
+
+    The bundle is memory-mapped, so loading is a single mmap call plus building the
+    vocabulary lookup, with no Keras model restore or vectorizer adapt step.
+
+    The model is Embedding -> GlobalAveragePooling1D -> Dense layers, and dropout does
+    nothing at inference time, so a few array operations are enough.
+    """
+
+    def __init__(self, path: str):
+        metadata, arrays = load_bundle(path)
+        self.vectorizer = TitleVectorizer(metadata["vocabulary"], metadata["sequence_length"])
+        self.embedding = arrays["embedding"]
+        self.dense = [
+            (arrays[f"dense_{i}_kernel"], arrays[f"dense_{i}_bias"], ACTIVATIONS[activation])
+            for i, activation in enumerate(metadata["dense_activations"])
+        ]
+
+    def score(self, titles: list[str]) -> list[float]:
+        """
+        Probability of each title belonging to a transaction email
+        """
+        if not titles:
+            return []
+        # The embedding has no mask, so padding is part of the average like in Keras
+        x = self.embedding[self.vectorizer(titles)].mean(axis=1)
+        for kernel, bias, activation in self.dense:
+            x = activation(x @ kernel + bias)
+        return [float(pred[0]) for pred in x]
+
+    def predict(self, titles: list[str], threshold: float = 0.5):
+        return [score > threshold for score in self.score(titles)]
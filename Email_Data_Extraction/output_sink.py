@@ -0,0 +1,195 @@
+import asyncio
+import csv
+import datetime
+import os
+import shutil
+from typing import Any, Callable
+
+# Flush once this many rows are buffered
+FLUSH_ROWS = 500
+
+# Otherwise flush this often, in seconds
+FLUSH_INTERVAL = 1.0
+
+
+def to_datetime(value: Any) -> datetime.datetime | None:
+    """
+    Extractors set dates as datetimes or as "%Y-%m-%d %H:%M:%S" strings
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    elif not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    return value.replace(tzinfo=None, microsecond=0)
+
+
+class BufferedSink:
+    """
+    Base class of the output sinks: rows are buffered and written in batches by a background
+    task, in a thread, so that output I/O never blocks the event loop.
+
+    Callbacks passed to `write` run once the rows are written, so progress can be recorded
+    only for rows that are actually saved. If writing fails, the error is raised by the next
+    `write` and when the sink is closed, and no more callbacks run.
+    Subclasses implement `_open`, `_write_batch` and `_finalize`, which all run in a thread.
+    """
+
+    def __init__(self, location: str, flush_rows: int = FLUSH_ROWS, flush_interval: float = FLUSH_INTERVAL):
+        # Where the rows end up, for reports
+        self.location = location
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        # Writers wait while this many rows are buffered
+        self.max_buffered_rows = 10 * flush_rows
+
+        self._rows: list[dict[str, Any]] = []
+        self._callbacks: list[Callable[[], None]] = []
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._closing = False
+        self._flusher: asyncio.Task | None = None
+        # Set when a batch could not be written, the sink accepts no more rows then
+        self._error: BaseException | None = None
+
+        # Metrics
+        self.rows_written = 0
+        self.flushes = 0
+
+    def _open(self):
+        raise NotImplementedError()
+
+    def _write_batch(self, rows: list[dict[str, Any]]):
+        raise NotImplementedError()
+
+    def _finalize(self, completed: bool):
+        """
+        Close the output. `completed` is False when the run stopped with an error.
+        """
+        raise NotImplementedError()
+
+    async def __aenter__(self):
+        await asyncio.to_thread(self._open)
+        self._flusher = asyncio.create_task(self._flush_loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._closing = True
+        self._wake.set()
+        await self._flusher  # type: ignore
+        await asyncio.to_thread(self._finalize, exc_type is None and self._error is None)
+        if self._error is not None and exc_type is None:
+            raise self._error
+
+    async def write(self, rows: list[dict[str, Any]], on_written: Callable[[], None] | None = None):
+        """
+        Queue rows for writing. `on_written` is called once they are written.
+        """
+        await self._space.wait()
+        if self._error is not None:
+            raise self._error
+        self._rows.extend(rows)
+        if on_written is not None:
+            self._callbacks.append(on_written)
+
+        if len(self._rows) >= self.flush_rows:
+            self._wake.set()
+        if len(self._rows) >= self.max_buffered_rows:
+            self._space.clear()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            rows, callbacks = self._rows, self._callbacks
+            self._rows, self._callbacks = [], []
+            self._space.set()
+            if rows:
+                try:
+                    await asyncio.to_thread(self._write_batch, rows)
+                except Exception as e:
+                    print(f"Writing to {self.location} failed: {e}")
+                    # Wake up waiting writers, so that they fail instead of waiting forever
+                    self._error = e
+                    self._space.set()
+                    return
+                self.rows_written += len(rows)
+                self.flushes += 1
+            for callback in callbacks:
+                callback()
+
+            if self._closing and not self._rows:
+                return
+
+    def report(self) -> str:
+        return f"Output: {self.rows_written} rows in {self.flushes} flushes to {self.location}"
+
+
+class CsvSink(BufferedSink):
+    """
+    CSV output that never leaves a half-written file.
+
+    Everything goes to `<path>.partial`, which is synced after every batch and renamed to
+    `path` when the sink is closed without an error. The previous `path` stays intact until then.
+
+    With `append`, the rows of earlier runs are kept: a `.partial` file left by an
+    interrupted run is continued, otherwise the existing output is copied into a new one.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fieldnames: list[str],
+        append: bool = False,
+        flush_rows: int = FLUSH_ROWS,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        super().__init__(path, flush_rows, flush_interval)
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        self.fieldnames = fieldnames
+        self.append = append
+        self._file = None
+        self._writer = None
+
+    def _open(self):
+        resumed = False
+        if self.append and os.path.exists(self.partial_path):
+            # Left by an interrupted run, and already holds everything written before
+            self._drop_partial_row()
+            resumed = True
+        elif self.append and os.path.exists(self.path):
+            shutil.copyfile(self.path, self.partial_path)
+            resumed = True
+
+        self._file = open(self.partial_path, "a" if resumed else "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        if not resumed:
+            self._writer.writeheader()
+
+    def _drop_partial_row(self):
+        """
+        Remove a row that was cut short when the previous run was killed
+        """
+        with open(self.partial_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _write_batch(self, rows: list[dict[str, Any]]):
+        self._writer.writerows(rows)  # type: ignore
+        self._file.flush()  # type: ignore
+        os.fsync(self._file.fileno())  # type: ignore
+
+    def _finalize(self, completed: bool):
+        self._file.close()  # type: ignore
+        if completed:
+            os.replace(self.partial_path, self.path)
+        else:
+            print(f"Output kept in {self.partial_path}, it will be continued by the next resumed run")
@@ -0,0 +1,134 @@
+import os
+import time
+import uuid
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from output_sink import BufferedSink, to_datetime
+
+# Every flush writes a file per month, so flushes are kept rare
+PARQUET_FLUSH_ROWS = 10_000
+PARQUET_FLUSH_INTERVAL = 30.0
+
+AMOUNT_TYPE = pa.decimal128(18, 4)
+
+# Same columns as the CSV output
+TRANSACTION_SCHEMA = pa.schema(
+    [
+        # Local time, as written in the emails
+        ("Datetime", pa.timestamp("s")),
+        ("Merchant Name", pa.dictionary(pa.int32(), pa.string())),
+        ("Sub Category", pa.string()),
+        ("Category", pa.string()),
+        ("Amount", AMOUNT_TYPE),
+        ("Currency", pa.string()),
+        ("Transaction Type", pa.dictionary(pa.int8(), pa.string())),
+        ("Payment Method", pa.dictionary(pa.int32(), pa.string())),
+        ("Transaction ID", pa.string()),
+        ("Notes", pa.string()),
+    ]
+)
+
+# Partition of transactions without a date
+UNKNOWN_MONTH = "unknown"
+
+
+def to_amount(value: Any) -> Decimal | None:
+    if value is None or value == "":
+        return None
+    return Decimal(str(value)).quantize(Decimal(1).scaleb(-AMOUNT_TYPE.scale), ROUND_HALF_EVEN)
+
+
+def month_of(row: dict[str, Any]) -> str:
+    date = row["Datetime"]
+    return f"{date:%Y-%m}" if date is not None else UNKNOWN_MONTH
+
+
+def to_table(rows: list[dict[str, Any]]) -> pa.Table:
+    columns = {name: [row.get(name) for row in rows] for name in TRANSACTION_SCHEMA.names}
+    return pa.Table.from_pydict(columns, schema=TRANSACTION_SCHEMA)
+
+
+class ParquetSink(BufferedSink):
+    """
+    Transactions as Parquet files with TRANSACTION_SCHEMA, partitioned by month:
+    `<directory>/month=YYYY-MM/part-<run>-<flush>.parquet`, one file per month and flush.
+    `pd.read_parquet(directory)` or `pyarrow.dataset` read the whole directory.
+
+    Takes the same rows as the CSV output. Every flush writes complete, synced files, so the
+    rows of a killed run are not lost. They are written as hidden `.part-*` files and only
+    become visible when the sink is closed without an error. Without `append`, that also
+    removes the files of earlier runs. With `append`, they are kept, and the hidden files of
+    an interrupted run are published along with this run's.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        append: bool = False,
+        flush_rows: int = PARQUET_FLUSH_ROWS,
+        flush_interval: float = PARQUET_FLUSH_INTERVAL,
+    ):
+        super().__init__(directory, flush_rows, flush_interval)
+        self.directory = directory
+        self.append = append
+        # Sorts by start time, and never clashes with the files of another run
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    def _month_files(self):
+        """
+        Yield (month directory, file name) of every Parquet file in the output
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for partition in sorted(os.listdir(self.directory)):
+            month_dir = os.path.join(self.directory, partition)
+            if partition.startswith("month=") and os.path.isdir(month_dir):
+                for name in sorted(os.listdir(month_dir)):
+                    if name.endswith((".parquet", ".parquet.tmp")):
+                        yield month_dir, name
+
+    def _open(self):
+        for month_dir, name in list(self._month_files()):
+            if not name.startswith("."):
+                continue
+            path = os.path.join(month_dir, name)
+            if not self.append:
+                os.remove(path)
+            elif name.endswith(".tmp"):
+                # The previous run was killed while writing this file, its rows were never reported as written
+                print(f"Removing unfinished Parquet file {path}")
+                os.remove(path)
+
+    def _write_batch(self, rows: list[dict[str, Any]]):
+        rows = [{**row, "Datetime": to_datetime(row.get("Datetime")), "Amount": to_amount(row.get("Amount"))} for row in rows]
+
+        by_month: dict[str, list[dict[str, Any]]] = {}
+        for row in rows:
+            by_month.setdefault(month_of(row), []).append(row)
+
+        for month, month_rows in by_month.items():
+            month_dir = os.path.join(self.directory, f"month={month}")
+            os.makedirs(month_dir, exist_ok=True)
+            path = os.path.join(month_dir, f".part-{self.run_id}-{self.flushes:05d}.parquet")
+            # Written under a temporary name and renamed once synced, so every hidden .parquet file is complete
+            with open(f"{path}.tmp", "wb") as f:
+                pq.write_table(to_table(month_rows), f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(f"{path}.tmp", path)
+
+    def _finalize(self, completed: bool):
+        if not completed:
+            print(f"Parquet output of this run kept hidden in {self.directory}, it will be published by the next resumed run")
+            return
+
+        for month_dir, name in list(self._month_files()):
+            path = os.path.join(month_dir, name)
+            if name.startswith("."):
+                os.replace(path, os.path.join(month_dir, name[1:]))
+            elif not self.append:
+                os.remove(path)
@@ -0,0 +1,167 @@
+import asyncio
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Iterable
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a Pipeline.
+
+    `workers` coroutines take items from a bounded input queue, call `handler` on them and
+    pass every item of the returned iterable (if any) on to the next stage. When the next
+    stage's queue is full the workers wait, which propagates backpressure up to the source.
+    With `batch_size` > 1 the handler receives a list of up to `batch_size` queued items.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Iterable[Any] | None]],
+        workers: int = 1,
+        queue_size: int = 1000,
+        batch_size: int = 1,
+        batch_timeout: float = 0.05,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+        # Metrics
+        self.received = 0
+        self.processed = 0
+        self.emitted = 0
+        self.max_depth = 0
+        self.busy_seconds = 0.0
+
+    async def put(self, item: Any):
+        await self.queue.put(item)
+        self.received += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def _next_batch(self) -> tuple[list, bool]:
+        """
+        Wait for the next batch of items. Also returns whether the end of the input was reached.
+        """
+        item = await self.queue.get()
+        if item is _DONE:
+            return [], True
+
+        batch = [item]
+        waited = False
+        while len(batch) < self.batch_size:
+            if self.queue.empty():
+                # Give the upstream stage a moment to fill the batch, but only once
+                if waited:
+                    break
+                await asyncio.sleep(self.batch_timeout)
+                waited = True
+                continue
+
+            item = self.queue.get_nowait()
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    async def _work(self, downstream: "Stage | None"):
+        while True:
+            batch, done = await self._next_batch()
+
+            if batch:
+                start = time.monotonic()
+                outputs = await self.handler(batch if self.batch_size > 1 else batch[0])
+                self.busy_seconds += time.monotonic() - start
+                self.processed += len(batch)
+
+                for output in outputs or []:
+                    if downstream is not None:
+                        await downstream.put(output)
+                    self.emitted += 1
+
+            if done:
+                return
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "received": self.received,
+            "processed": self.processed,
+            "emitted": self.emitted,
+            "busy_seconds": round(self.busy_seconds, 2),
+        }
+
+
+class Pipeline:
+    """
+    Run a source and a chain of stages concurrently, connected by bounded queues.
+    """
+
+    def __init__(self, source: AsyncIterable[Any], stages: list[Stage], report_interval: float | None = 10.0):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.source = source
+        self.stages = stages
+        self.report_interval = report_interval
+        self.produced = 0
+
+    async def _produce(self):
+        first = self.stages[0]
+        async for item in self.source:
+            await first.put(item)
+            self.produced += 1
+
+        for _ in range(first.workers):
+            await first.queue.put(_DONE)
+
+    async def _run_stage(self, index: int):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        await asyncio.gather(*[stage._work(downstream) for _ in range(stage.workers)])
+
+        # Only close the next stage once every worker of this one has finished
+        if downstream is not None:
+            for _ in range(downstream.workers):
+                await downstream.queue.put(_DONE)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)  # type: ignore
+            print(self.format_metrics())
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        return {stage.name: stage.metrics() for stage in self.stages}
+
+    def format_metrics(self) -> str:
+        lines = [f"Pipeline: {self.produced} items from source"]
+        for name, m in self.metrics().items():
+            lines.append(
+                f"  {name}: depth {m['depth']} (max {m['max_depth']}), "
+                f"processed {m['processed']}/{m['received']}, emitted {m['emitted']}, "
+                f"busy {m['busy_seconds']}s over {m['workers']} worker(s)"
+            )
+        return "\n".join(lines)
+
+    async def run(self):
+        tasks = [asyncio.create_task(self._produce())]
+        tasks += [asyncio.create_task(self._run_stage(i)) for i in range(len(self.stages))]
+        reporter = asyncio.create_task(self._report()) if self.report_interval else None
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if reporter is not None:
+                reporter.cancel()
@@ -0,0 +1,155 @@
+import datetime
+import sqlite3
+
+JOURNAL_PATH = "progress.sqlite3"
+
+# Message outcomes
+LISTED = "listed"
+SKIPPED = "skipped"
+EXTRACTED = "extracted"
+DUMPED = "dumped"
+ERRORED = "errored"
+
+# Outcomes after which a message never has to be looked at again
+COMPLETED = (SKIPPED, EXTRACTED, DUMPED)
+
+# Messages that errored this many times are not retried anymore, unless asked to
+MAX_ATTEMPTS = 3
+
+
+class ProgressJournal:
+    """
+    Durable record of the extraction progress, kept in a SQLite database in WAL mode.
+
+    Every message is recorded when it is listed and again when it reaches a final outcome,
+    so an interrupted run can be resumed: completed messages are skipped, listed but
+    unfinished ones are retried, and listing continues from the saved page position.
+    Checkpoints (page token and position within the page, Gmail historyId) are stored alongside the messages.
+
+    Errors are counted per message. A message that errored `max_attempts` times (e.g. deleted,
+    or undecodable) is given up on and skipped like a completed one; with `max_attempts=None`
+    every errored message is retried.
+    """
+
+    def __init__(self, path: str = JOURNAL_PATH, max_attempts: int | None = MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Autocommit: each record is durable as soon as it is written
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS messages (
+                message_id TEXT PRIMARY KEY,
+                outcome TEXT NOT NULL,
+                detail TEXT,
+                updated_at TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(messages)")]
+        if "attempts" not in columns:
+            # Journals written before errors were counted
+            self.conn.execute("ALTER TABLE messages ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS messages_outcome ON messages (outcome)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints (name TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    def record(self, message_id: str, outcome: str, detail: str | None = None):
+        errored = int(outcome == ERRORED)
+        self.conn.execute(
+            """
+            INSERT INTO messages (message_id, outcome, detail, updated_at, attempts) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (message_id) DO UPDATE SET
+                outcome = excluded.outcome,
+                detail = excluded.detail,
+                updated_at = excluded.updated_at,
+                attempts = attempts + excluded.attempts
+            """,
+            (message_id, outcome, detail, datetime.datetime.now().isoformat(), errored),
+        )
+
+    def record_listed(self, message_id: str):
+        """
+        Record a newly listed message, without overwriting the outcome of one seen before
+        """
+        self.conn.execute(
+            "INSERT OR IGNORE INTO messages (message_id, outcome, updated_at) VALUES (?, ?, ?)",
+            (message_id, LISTED, datetime.datetime.now().isoformat()),
+        )
+
+    def get_outcome(self, message_id: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT outcome FROM messages WHERE message_id = ?", (message_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_completed(self, message_id: str) -> bool:
+        return self.get_outcome(message_id) in COMPLETED
+
+    def is_given_up(self, message_id: str) -> bool:
+        if self.max_attempts is None:
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM messages WHERE message_id = ? AND outcome = ? AND attempts >= ?",
+            (message_id, ERRORED, self.max_attempts),
+        ).fetchone()
+        return row is not None
+
+    def is_settled(self, message_id: str) -> bool:
+        """
+        Whether the message needs no more work: completed, or given up on after too many errors
+        """
+        return self.is_completed(message_id) or self.is_given_up(message_id)
+
+    def pending_ids(self) -> list[str]:
+        """
+        Messages that were listed by an earlier run but never completed, including errored ones
+        that haven't used up their attempts
+        """
+        if self.max_attempts is None:
+            rows = self.conn.execute(
+                "SELECT message_id FROM messages WHERE outcome IN (?, ?) ORDER BY updated_at",
+                (LISTED, ERRORED),
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT message_id FROM messages WHERE outcome = ? OR (outcome = ? AND attempts < ?) ORDER BY updated_at",
+                (LISTED, ERRORED, self.max_attempts),
+            )
+        return [row[0] for row in rows]
+
+    def given_up_count(self) -> int:
+        if self.max_attempts is None:
+            return 0
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE outcome = ? AND attempts >= ?", (ERRORED, self.max_attempts)
+        ).fetchone()
+        return row[0]
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone() is None
+
+    def counts(self) -> dict[str, int]:
+        rows = self.conn.execute("SELECT outcome, COUNT(*) FROM messages GROUP BY outcome")
+        return {outcome: count for outcome, count in rows}
+
+    def get_checkpoint(self, name: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT value FROM checkpoints WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_checkpoint(self, name: str, value: str | None):
+        if value is None:
+            self.conn.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+        else:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, value) VALUES (?, ?)", (name, value)
+            )
+
+    def close(self):
+        self.conn.close()
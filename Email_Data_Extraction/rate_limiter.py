@@ -0,0 +1,103 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+from aiogoogle.excs import HTTPError
+
+T = TypeVar("T")
+
+# Gmail allows 250 quota units per user per second
+QUOTA_UNITS_PER_SECOND = 250
+
+# Fraction of the quota we aim for, so bursts from other clients don't push us over
+QUOTA_HEADROOM = 0.9
+
+# Quota units per method, see https://developers.google.com/gmail/api/reference/quota
+# Calls inside a batch request are charged individually.
+QUOTA_COSTS = {
+    "users.getProfile": 1,
+    "users.history.list": 2,
+    "users.messages.get": 5,
+    "users.messages.list": 5,
+}
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GmailQuotaLimiter:
+    """
+    Token bucket counting Gmail quota units.
+    Callers are released one at a time, in arrival order, as soon as enough units have
+    accumulated, so requests go out at a steady rate just under the quota.
+    """
+
+    def __init__(self, units_per_second: float = QUOTA_UNITS_PER_SECOND * QUOTA_HEADROOM, burst: float | None = None):
+        self.rate = units_per_second
+        self.capacity = burst if burst is not None else units_per_second
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, units: float):
+        """
+        Wait until `units` quota units are available and consume them
+        """
+        async with self._lock:
+            self._refill()
+            if self._tokens < units:
+                # Requests larger than the bucket (e.g. big batches) just wait for the whole deficit
+                await asyncio.sleep((units - self._tokens) / self.rate)
+                self._refill()
+                self._tokens = max(self._tokens, units)
+            self._tokens -= units
+
+    async def acquire_for(self, method: str, count: int = 1):
+        """
+        Wait for the quota of `count` calls to the given Gmail method, e.g. "users.messages.get"
+        """
+        await self.acquire(QUOTA_COSTS[method] * count)
+
+    async def call_with_backoff(self, method: str, call: Callable[[], Awaitable[T]], count: int = 1) -> T:
+        """
+        Run `call` with `with_backoff`, waiting for the quota of `count` calls to `method` before every
+        attempt. Retries are paid for too, as they are exactly when Gmail asks for less traffic.
+        """
+
+        async def charged_call() -> T:
+            await self.acquire_for(method, count)
+            return await call()
+
+        return await with_backoff(charged_call)
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 32.0) -> float:
+    """
+    Exponential backoff with full jitter for the given (zero-based) retry attempt
+    """
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+async def with_backoff(call: Callable[[], Awaitable[T]], max_retries: int = 6) -> T:
+    """
+    Run `call`, retrying rate-limited and transient HTTP errors with exponential backoff.
+    The last error is raised once `max_retries` retries have been used up.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except HTTPError as e:
+            status = e.res.status_code if e.res is not None else None
+            if status not in RETRY_STATUSES or attempt >= max_retries:
+                raise e
+
+            delay = backoff_delay(attempt)
+            print(f"Request failed with HTTP {status}, retrying in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,180 @@
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+RAW_CACHE_DIR = "cache/raw"
+
+# Default size budget of the cache, in bytes of compressed data
+RAW_CACHE_MAX_BYTES = 2 * 1024**3
+
+# After going over budget, evict down to this fraction of it so eviction doesn't run on every write
+_EVICT_TO = 0.9
+
+
+class RawMessageCache:
+    """
+    On-disk cache of raw MIME messages (.eml bytes), keyed by Gmail message ID.
+
+    Entries are compressed (zstd when the `zstandard` package is installed, gzip otherwise)
+    and spread over 256 subdirectories by a hash of the message ID. Reading an entry
+    refreshes its modification time; when the cache grows past `max_bytes`, the least
+    recently used entries are removed first.
+
+    The size of the cache is known after scanning it, which `load` does in a thread;
+    otherwise the first write scans it. `get_many` and `put_many` read and write a batch
+    of entries in a thread, so compression and file I/O never block the event loop.
+    """
+
+    def __init__(self, root: str = RAW_CACHE_DIR, max_bytes: int = RAW_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.extension = ".eml.zst" if zstandard else ".eml.gz"
+        self.hits = 0
+        self.misses = 0
+
+        # path -> (last used, size), loaded from disk on first use
+        self._index: dict[str, tuple[float, int]] | None = None
+        self._total_bytes = 0
+        # Guards the index and the counters, which threads of concurrent batches update
+        self._lock = threading.RLock()
+
+    def _dir(self, message_id: str) -> str:
+        shard = hashlib.sha1(message_id.encode()).hexdigest()[:2]
+        return os.path.join(self.root, shard)
+
+    def _load_index(self) -> dict[str, tuple[float, int]]:
+        with self._lock:
+            if self._index is None:
+                self._index = {}
+                self._total_bytes = 0
+                if os.path.isdir(self.root):
+                    for shard in os.scandir(self.root):
+                        if not shard.is_dir():
+                            continue
+                        for entry in os.scandir(shard.path):
+                            if entry.name.endswith((".eml.zst", ".eml.gz")):
+                                stat = entry.stat()
+                                self._index[entry.path] = (stat.st_mtime, stat.st_size)
+                                self._total_bytes += stat.st_size
+            return self._index
+
+    async def load(self):
+        """
+        Scan the cache directory without blocking the event loop
+        """
+        await asyncio.to_thread(self._load_index)
+
+    def _find(self, message_id: str) -> str | None:
+        directory = self._dir(message_id)
+        # Entries written with the other codec stay readable
+        for extension in (self.extension, ".eml.gz", ".eml.zst"):
+            path = os.path.join(directory, message_id + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def get(self, message_id: str) -> bytes | None:
+        """
+        Return the raw message, or None if it is not cached.
+        Every call counts as one hit or one miss.
+        """
+        path = self._find(message_id)
+        try:
+            if path is None or (path.endswith(".zst") and zstandard is None):
+                raise FileNotFoundError(message_id)
+            with open(path, "rb") as f:
+                data = f.read()
+            # Mark as recently used
+            now = time.time()
+            os.utime(path, (now, now))
+        except FileNotFoundError:
+            # Not cached, or evicted by a concurrent write in the meantime
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if path.endswith(".zst"):
+            raw = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            raw = gzip.decompress(data)
+
+        with self._lock:
+            index = self._load_index()
+            index[path] = (now, len(data))
+            self.hits += 1
+        return raw
+
+    async def get_many(self, message_ids: list[str]) -> dict[str, bytes]:
+        """
+        The cached raw messages of the given IDs, read in a thread
+        """
+        def read() -> dict[str, bytes]:
+            raws = {}
+            for message_id in message_ids:
+                raw = self.get(message_id)
+                if raw is not None:
+                    raws[message_id] = raw
+            return raws
+
+        return await asyncio.to_thread(read)
+
+    def put(self, message_id: str, raw: bytes):
+        if zstandard:
+            data = zstandard.ZstdCompressor(level=3).compress(raw)
+        else:
+            data = gzip.compress(raw, compresslevel=6)
+
+        directory = self._dir(message_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, message_id + self.extension)
+
+        # Write to a temporary file first so readers never see a partial entry
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            index = self._load_index()
+            if path in index:
+                self._total_bytes -= index[path][1]
+            index[path] = (os.path.getmtime(path), len(data))
+            self._total_bytes += len(data)
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    async def put_many(self, raws: dict[str, bytes]):
+        """
+        Cache the given {message ID: raw message}, written in a thread
+        """
+        def write():
+            for message_id, raw in raws.items():
+                self.put(message_id, raw)
+
+        await asyncio.to_thread(write)
+
+    def _evict(self):
+        index = self._load_index()
+        target = self.max_bytes * _EVICT_TO
+
+        for path, (_, size) in sorted(index.items(), key=lambda item: item[1][0]):
+            if self._total_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            del index[path]
+            self._total_bytes -= size
+
+    def __contains__(self, message_id: str) -> bool:
+        return self._find(message_id) is not None
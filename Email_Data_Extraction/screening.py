@@ -0,0 +1,154 @@
+from collections import Counter
+
+from classifier_service import BatchingClassifier
+from extraction import extract_domain
+from extractors.dispatch import ExtractorIndex
+
+# Minimum classifier score for a title no extractor matched to be admitted
+CLASSIFIER_THRESHOLD = 0.5
+
+CLASSIFIER = "classifier"
+
+
+def classifier_input(subject: str, from_email: str) -> str:
+    """
+    The text the title classifier was trained on
+    """
+    return f"{subject} from:{extract_domain(from_email)}"
+
+
+class ScreenVerdict:
+    def __init__(self, admitted: bool, gate_admitted: bool, admitted_by: str | None, score: float | None):
+        # Whether the raw message should be fetched
+        self.admitted = admitted
+        # Whether the strict gate admitted it, which differs from `admitted` when the gate is not enforced
+        self.gate_admitted = gate_admitted
+        # The extractor(s) that matched, CLASSIFIER, or None if rejected by the gate
+        self.admitted_by = admitted_by
+        # Classifier score, if the classifier was asked
+        self.score = score
+
+    def describe(self) -> str:
+        if self.admitted_by == CLASSIFIER:
+            return f"admitted by classifier ({self.score:.3f})"
+        if self.admitted_by:
+            return f"admitted by {self.admitted_by}"
+        if self.score is not None:
+            return f"rejected by classifier ({self.score:.3f})"
+        return "rejected"
+
+
+class Screener:
+    """
+    Decide from the title and sender alone whether a message is worth fetching in full.
+
+    The gate admits a message if an extractor matches it, or else if the title classifier
+    scores it at least `threshold`. With `strict` off every message is admitted, but the gate's
+    decision is still recorded, so the run measures what the gate would have missed.
+
+    Every decision is accounted for: `record_result` is told how many transactions each
+    admitted message yielded, which gives the precision of each admitting extractor and of
+    the classifier, the number of wasted raw fetches and (without `strict`) the recall.
+    """
+
+    def __init__(
+        self,
+        index: ExtractorIndex,
+        classifier: BatchingClassifier,
+        threshold: float = CLASSIFIER_THRESHOLD,
+        strict: bool = True,
+    ):
+        self.index = index
+        self.classifier = classifier
+        self.threshold = threshold
+        self.strict = strict
+
+        # Verdicts of admitted messages waiting for their extraction result
+        self._pending: dict[str, ScreenVerdict] = {}
+
+        self.screened = 0
+        self.rejected = 0
+        # Admitting extractor(s) or CLASSIFIER -> number of messages
+        self.admitted = Counter()
+        self.fetched = Counter()
+        self.productive = Counter()
+        self.transactions = Counter()
+        # Messages the gate rejected that still had transactions (only seen without `strict`)
+        self.missed = 0
+        self.missed_transactions = 0
+
+    async def screen(self, message_id: str, subject: str, from_email: str) -> ScreenVerdict:
+        self.screened += 1
+
+        matched = self.index.match(subject, from_email)
+        if matched:
+            verdict = ScreenVerdict(True, True, "+".join(type(ex).__name__ for ex in matched), None)
+        else:
+            score = await self.classifier.score(classifier_input(subject, from_email))
+            gate_admitted = score >= self.threshold
+            verdict = ScreenVerdict(
+                gate_admitted or not self.strict, gate_admitted, CLASSIFIER if gate_admitted else None, score
+            )
+
+        if verdict.gate_admitted:
+            self.admitted[verdict.admitted_by] += 1
+        else:
+            self.rejected += 1
+
+        if verdict.admitted:
+            self._pending[message_id] = verdict
+        return verdict
+
+    def record_result(self, message_id: str, transactions: int | None) -> ScreenVerdict | None:
+        """
+        Record how many transactions an admitted message yielded, or None if it could not be processed
+        """
+        verdict = self._pending.pop(message_id, None)
+        if verdict is None or transactions is None:
+            return verdict
+
+        if not verdict.gate_admitted:
+            if transactions:
+                self.missed += 1
+                self.missed_transactions += transactions
+            return verdict
+
+        self.fetched[verdict.admitted_by] += 1
+        if transactions:
+            self.productive[verdict.admitted_by] += 1
+            self.transactions[verdict.admitted_by] += transactions
+        return verdict
+
+    def wasted_fetches(self) -> int:
+        """
+        Messages admitted by the gate and fetched that yielded no transactions
+        """
+        return sum(self.fetched.values()) - sum(self.productive.values())
+
+    def report(self) -> str:
+        total_fetched = sum(self.fetched.values())
+        total_productive = sum(self.productive.values())
+
+        lines = [
+            f"Screening ({'strict' if self.strict else 'audit, gate not enforced'}): "
+            f"{self.screened} screened, {sum(self.admitted.values())} admitted, {self.rejected} rejected"
+        ]
+        for admitted_by, count in self.admitted.most_common():
+            fetched = self.fetched[admitted_by]
+            precision = f"{self.productive[admitted_by] / fetched:.1%}" if fetched else "n/a"
+            lines.append(
+                f"  {admitted_by}: admitted {count}, fetched {fetched}, "
+                f"with transactions {self.productive[admitted_by]} ({precision}), "
+                f"transactions {self.transactions[admitted_by]}"
+            )
+
+        precision = f"{total_productive / total_fetched:.1%}" if total_fetched else "n/a"
+        lines.append(f"  Raw fetches without transactions: {self.wasted_fetches()} of {total_fetched} (precision {precision})")
+        if not self.strict:
+            found = total_productive + self.missed
+            recall = f"{total_productive / found:.1%}" if found else "n/a"
+            lines.append(
+                f"  Rejected messages with transactions: {self.missed} "
+                f"({self.missed_transactions} transactions, recall {recall})"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,69 @@
+import asyncio
+import gc
+import threading
+
+import pytest
+
+from classifier_service import BatchingClassifier
+
+
+class LengthClassifier:
+    def __init__(self, release: threading.Event | None = None):
+        self.release = release
+        self.batches: list[list[str]] = []
+
+    def score(self, titles: list[str]) -> list[float]:
+        if self.release is not None:
+            self.release.wait(5)
+        self.batches.append(titles)
+        return [len(title) / 100 for title in titles]
+
+
+def test_titles_are_scored_in_batches_and_tasks_released():
+    model = LengthClassifier()
+    classifier = BatchingClassifier(lambda: model, max_batch_size=3)
+
+    async def run():
+        waiters = [asyncio.ensure_future(classifier.score(title)) for title in ["a", "bb", "ccc", "dddd"]]
+        await asyncio.sleep(0)
+        # Only the classifier holds the batch tasks
+        gc.collect()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == [0.01, 0.02, 0.03, 0.04]
+    assert model.batches == [["a", "bb", "ccc"], ["dddd"]]
+    assert not classifier._tasks
+
+
+def test_close_cancels_batches_in_flight():
+    release = threading.Event()
+    classifier = BatchingClassifier(lambda: LengthClassifier(release), max_batch_size=1)
+
+    async def run():
+        waiter = asyncio.ensure_future(classifier.score("title"))
+        await asyncio.sleep(0.05)
+        assert len(classifier._tasks) == 1
+        await classifier.close()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert not classifier._tasks
+
+
+def test_errors_reach_every_waiter():
+    class BrokenCache:
+        def get(self, title):
+            return None
+
+        def put(self, title, score):
+            raise OSError("disk full")
+
+    classifier = BatchingClassifier(lambda: LengthClassifier(), cache=BrokenCache())  # type: ignore
+
+    async def run():
+        return await asyncio.gather(classifier.score("a"), classifier.score("b"), return_exceptions=True)
+
+    results = asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert [type(result) for result in results] == [OSError, OSError]
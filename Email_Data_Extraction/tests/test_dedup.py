@@ -0,0 +1,54 @@
+import asyncio
+import datetime
+from decimal import Decimal
+
+from dedup import TransactionDeduplicator
+from extract_email_data import dedup_replayed, dedup_transactions
+from extractors.base_extractor import TransactionData
+
+
+def make_transaction(trx_id: str, source: str, proper: bool = True) -> TransactionData:
+    trx = TransactionData()
+    trx.trx_id = trx_id
+    trx.date = datetime.datetime(2024, 11, 20, 10, 0)
+    trx.amount = Decimal(50000)
+    trx.currency = "IDR"
+    trx.source = source
+    if proper:
+        trx.merchant = "OVO"
+        trx.payment_method = "OVO"
+        trx.is_incoming = False
+        trx.description = ""
+    return trx
+
+
+def test_improper_transaction_does_not_hide_proper_copy_by_id():
+    deduper = TransactionDeduplicator(None, append=False)
+    first = asyncio.run(dedup_replayed(deduper, ("a", [make_transaction("T1", "OVOExtractor", proper=False)])))
+    second = asyncio.run(dedup_replayed(deduper, ("b", [make_transaction("T1", "BRIExtractor")])))
+
+    assert first == []
+    assert len(second) == 1 and second[0][0].trx_id == "T1"
+    assert deduper.duplicates() == 0
+
+
+def test_improper_transaction_does_not_hide_proper_copy_by_window():
+    deduper = TransactionDeduplicator(None, append=False)
+    improper = make_transaction("", "OVOExtractor", proper=False)
+    proper = make_transaction("", "BRIExtractor")
+    proper.date += datetime.timedelta(minutes=3)
+
+    asyncio.run(dedup_transactions(deduper, ("a", [improper], None)))
+    [(message_id, kept, _)] = asyncio.run(dedup_transactions(deduper, ("b", [proper], None)))
+
+    assert message_id == "b"
+    assert kept == [proper]
+
+
+def test_proper_copy_in_another_email_is_a_duplicate():
+    deduper = TransactionDeduplicator(None, append=False)
+    asyncio.run(dedup_replayed(deduper, ("a", [make_transaction("T1", "OVOExtractor")])))
+    second = asyncio.run(dedup_replayed(deduper, ("b", [make_transaction("T1", "BRIExtractor")])))
+
+    assert second == []
+    assert deduper.by_id == 1
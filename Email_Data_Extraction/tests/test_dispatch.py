@@ -0,0 +1,92 @@
+import email
+import email.policy
+import email.utils
+import os
+
+import pytest
+
+from extraction import create_extractors, index
+from extractors.base_extractor import BaseExtractor
+from extractors.dispatch import ExtractorIndex
+from extractors.rules import CONTAINS, CONTAINS_ALL, ENDSWITH, EQUALS, STARTSWITH, TitleRule
+from mail_sources import iter_messages
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def brute_force_match(extractors: list[BaseExtractor], title: str, email_from: str) -> list[BaseExtractor]:
+    """
+    What dispatch did before the index: ask every extractor
+    """
+    address = email.utils.parseaddr(email_from)[1]
+    return [ex for ex in extractors if ex.match(title, address)]
+
+
+def titles_for(rule: TitleRule) -> list[str]:
+    """
+    Titles the rule accepts, and near misses it rejects
+    """
+    text = rule.texts[0]
+    if rule.kind == EQUALS:
+        titles = [text, f"Fwd: {text}", f"{text} "]
+    elif rule.kind == STARTSWITH:
+        titles = [f"{text} #INV-123", f"Re: {text}"]
+    elif rule.kind == ENDSWITH:
+        titles = [f"Fwd: {text}", f"{text}."]
+    elif rule.kind == CONTAINS:
+        titles = [f"[Promo] {text} hari ini", text[1:]]
+    else:
+        titles = [" | ".join(reversed(rule.texts)), " | ".join(rule.texts[:-1])]
+    titles.append(text[:-1])
+    if rule.ignore_case:
+        titles += [title.upper() for title in titles]
+    return titles
+
+
+def senders_of(ex: BaseExtractor) -> list[str]:
+    senders = [f"{type(ex).__name__} <{address.upper()}>" for address in ex.senders]
+    senders += [f"no-reply@{domain}" for domain in ex.sender_domains]
+    return senders or ["someone@example.com"]
+
+
+def cases() -> list[tuple[str, str]]:
+    extractors = create_extractors()
+    titles = [title for ex in extractors for rule in ex.title_rules for title in titles_for(rule)]
+    senders = [sender for ex in extractors for sender in senders_of(ex)] + ["someone@example.com"]
+    return [(title, sender) for sender in senders for title in titles]
+
+
+def sample_cases() -> list[tuple[str, str]]:
+    samples = []
+    for _, raw in iter_messages(os.path.join(HERE, "samples")):
+        message = email.message_from_bytes(raw, policy=email.policy.default)
+        samples.append((str(message["Subject"]), str(message["From"])))
+    return samples
+
+
+@pytest.mark.parametrize("title, email_from", sample_cases())
+def test_samples_dispatch_like_brute_force(title: str, email_from: str):
+    matched = index.match(title, email_from)
+
+    assert matched
+    assert matched == brute_force_match(index.extractors, title, email_from)
+
+
+def test_compiled_rules_dispatch_like_brute_force():
+    dispatcher = ExtractorIndex(create_extractors())
+    mismatches = []
+    for title, email_from in cases():
+        expected = brute_force_match(dispatcher.extractors, title, email_from)
+        if dispatcher.match(title, email_from) != expected:
+            mismatches.append((title, email_from, [type(ex).__name__ for ex in expected]))
+
+    assert mismatches == []
+
+
+def test_every_extractor_is_reachable():
+    dispatcher = ExtractorIndex(create_extractors())
+    reached = set()
+    for title, email_from in cases():
+        reached.update(type(ex) for ex in dispatcher.match(title, email_from))
+
+    assert reached == {type(ex) for ex in dispatcher.extractors}
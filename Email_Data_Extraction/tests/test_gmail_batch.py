@@ -0,0 +1,146 @@
+import asyncio
+import email
+import email.policy
+import json
+from types import SimpleNamespace
+
+from aiogoogle.excs import HTTPError
+
+import gmail_batch
+import rate_limiter
+from gmail_batch import GmailBatchTransport, decode_batch, encode_batch
+from rate_limiter import GmailQuotaLimiter
+
+BOUNDARY = "batch_response"
+
+
+def batch_response(parts: list[tuple[int, int, object]]) -> str:
+    """
+    A multipart/mixed batch response with (item index, HTTP status, JSON body) parts
+    """
+    body = []
+    for index, status, data in parts:
+        body.append(
+            f"--{BOUNDARY}\r\n"
+            "Content-Type: application/http\r\n"
+            f"Content-ID: <response-item-{index}>\r\n"
+            "\r\n"
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            "Content-Type: application/json; charset=UTF-8\r\n"
+            "\r\n"
+            f"{json.dumps(data)}\r\n"
+        )
+    body.append(f"--{BOUNDARY}--\r\n")
+    return "".join(body)
+
+
+def requested_ids(request) -> list[str]:
+    """
+    The message IDs of a batch request, in order
+    """
+    envelope = email.message_from_string(
+        f"Content-Type: {request.headers['Content-Type']}\r\n\r\n{request.data}", policy=email.policy.compat32
+    )
+    return [part.get_payload().split(" ")[1].split("?")[0].rsplit("/", 1)[1] for part in envelope.get_payload()]
+
+
+class FakeResponse:
+    def __init__(self, content: str):
+        self.headers = {"Content-Type": f"multipart/mixed; boundary={BOUNDARY}"}
+        self.content = content
+
+
+class FakeBatchEndpoint:
+    """
+    Stands in for Aiogoogle: answers each batch with the statuses given per message ID and attempt
+    """
+
+    def __init__(self, statuses: dict[str, list[int]]):
+        self.statuses = statuses
+        self.batches: list[list[str]] = []
+
+    async def as_user(self, request, full_res: bool = False):
+        assert request.method == "POST" and request.url == gmail_batch.BATCH_URL
+        ids = requested_ids(request)
+        self.batches.append(ids)
+        parts = []
+        for index, message_id in enumerate(ids):
+            status = self.statuses[message_id].pop(0)
+            data = {"id": message_id} if status == 200 else {"error": {"code": status}}
+            parts.append((index, status, data))
+        return FakeResponse(batch_response(parts))
+
+
+def test_encode_batch_has_one_get_per_message():
+    body = encode_batch(["a1", "b2"], "xyz", format="metadata", params={"metadataHeaders": ["Subject", "From"]})
+
+    assert body.count("--xyz\r\n") == 2 and body.endswith("--xyz--\r\n")
+    assert "Content-ID: <item-1>" in body
+    assert "GET /gmail/v1/users/me/messages/b2?format=metadata&metadataHeaders=Subject&metadataHeaders=From" in body
+
+
+def test_decode_batch_matches_parts_to_items():
+    responses = decode_batch(
+        f"multipart/mixed; boundary={BOUNDARY}", batch_response([(1, 404, {"error": {"code": 404}}), (0, 200, {"id": "a"})])
+    )
+
+    assert responses == {0: (200, {"id": "a"}), 1: (404, {"error": {"code": 404}})}
+
+
+def test_failed_parts_are_retried(monkeypatch):
+    monkeypatch.setattr(gmail_batch, "backoff_delay", lambda attempt: 0)
+    endpoint = FakeBatchEndpoint({"a": [200], "b": [429, 200], "c": [503, 200], "d": [404]})
+    transport = GmailBatchTransport(endpoint, GmailQuotaLimiter(units_per_second=1e9), batch_size=3)
+
+    results = asyncio.run(transport.get_messages(["a", "b", "c", "d"], format="raw"))
+
+    assert results == {"a": {"id": "a"}, "b": {"id": "b"}, "c": {"id": "c"}}
+    # Split by batch_size, then only the rate limited and transiently failed parts again
+    assert endpoint.batches == [["a", "b", "c"], ["d"], ["b", "c"]]
+
+
+def test_parts_still_failing_are_given_up(monkeypatch):
+    monkeypatch.setattr(gmail_batch, "backoff_delay", lambda attempt: 0)
+    endpoint = FakeBatchEndpoint({"a": [500, 500, 500]})
+    transport = GmailBatchTransport(endpoint, GmailQuotaLimiter(units_per_second=1e9), max_retries=2)
+
+    assert asyncio.run(transport.get_messages(["a"])) == {}
+    assert len(endpoint.batches) == 3
+
+
+class RecordingLimiter(GmailQuotaLimiter):
+    def __init__(self):
+        super().__init__(units_per_second=1e9)
+        self.charged: list[tuple[str, int]] = []
+
+    async def acquire_for(self, method: str, count: int = 1):
+        self.charged.append((method, count))
+        await super().acquire_for(method, count)
+
+
+class RejectedOnce:
+    """
+    Answers the first batch with HTTP 429 for the whole request, then like the wrapped endpoint
+    """
+
+    def __init__(self, endpoint: FakeBatchEndpoint):
+        self.endpoint = endpoint
+        self.rejected = False
+
+    async def as_user(self, request, full_res: bool = False):
+        if not self.rejected:
+            self.rejected = True
+            raise HTTPError("Too many requests", res=SimpleNamespace(status_code=429))
+        return await self.endpoint.as_user(request, full_res)
+
+
+def test_every_attempt_is_charged(monkeypatch):
+    monkeypatch.setattr(gmail_batch, "backoff_delay", lambda attempt: 0)
+    monkeypatch.setattr(rate_limiter, "backoff_delay", lambda attempt: 0)
+    limiter = RecordingLimiter()
+    endpoint = FakeBatchEndpoint({"a": [200], "b": [429, 200]})
+    transport = GmailBatchTransport(RejectedOnce(endpoint), limiter)
+
+    assert asyncio.run(transport.get_messages(["a", "b"])) == {"a": {"id": "a"}, "b": {"id": "b"}}
+    # The rejected batch, its retry, then the retry of the rate limited part
+    assert limiter.charged == [("users.messages.get", 2), ("users.messages.get", 2), ("users.messages.get", 1)]
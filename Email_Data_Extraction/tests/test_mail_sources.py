@@ -0,0 +1,38 @@
+import asyncio
+import mailbox
+from email.message import EmailMessage
+
+from mail_sources import aiter_messages, iter_messages
+
+
+def make_message(subject: str, message_id: str | None) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = subject
+    message["From"] = "noreply@example.com"
+    if message_id is not None:
+        message["Message-ID"] = message_id
+    message.set_content("body")
+    return message
+
+
+def test_mbox_messages_by_message_id(tmp_path):
+    path = str(tmp_path / "mail.mbox")
+    box = mailbox.mbox(path)
+    box.add(make_message("first", "<one@example.com>"))
+    box.add(make_message("second", None))
+    box.close()
+
+    messages = list(iter_messages(path))
+
+    assert [message_id for message_id, _ in messages] == ["one@example.com", "mbox-1"]
+    assert b"Subject: second" in messages[1][1]
+
+
+def test_aiter_messages_reads_every_file(tmp_path):
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.eml").write_bytes(bytes(make_message(name, None)))
+
+    async def collect():
+        return [item async for item in aiter_messages(str(tmp_path))]
+
+    assert [message_id for message_id, _ in asyncio.run(collect())] == ["a", "b"]
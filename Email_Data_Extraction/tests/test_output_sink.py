@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from output_sink import BufferedSink, CsvSink
+
+
+class FailingSink(BufferedSink):
+    def __init__(self):
+        super().__init__("failing", flush_rows=2, flush_interval=0.01)
+        self.finalized = None
+
+    def _open(self):
+        pass
+
+    def _write_batch(self, rows):
+        raise OSError("No space left on device")
+
+    def _finalize(self, completed: bool):
+        self.finalized = completed
+
+
+def test_write_error_fails_writers_instead_of_hanging():
+    sink = FailingSink()
+    written = []
+
+    async def run():
+        async with sink:
+            for i in range(100):
+                await sink.write([{"row": i}], lambda: written.append(i))
+
+    with pytest.raises(OSError, match="No space left"):
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert written == []
+    assert sink.finalized is False
+
+
+def test_write_error_is_raised_on_close():
+    sink = FailingSink()
+
+    async def run():
+        async with sink:
+            await sink.write([{"row": 0}])
+
+    with pytest.raises(OSError):
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+    assert sink.finalized is False
+
+
+def test_csv_sink_replaces_output_when_completed(tmp_path):
+    path = tmp_path / "out.csv"
+    written = []
+
+    async def run():
+        async with CsvSink(str(path), ["a", "b"]) as sink:
+            await sink.write([{"a": 1, "b": 2}], lambda: written.append(True))
+
+    asyncio.run(run())
+    assert path.read_text().splitlines() == ["a,b", "1,2"]
+    assert written == [True]
+    assert not (tmp_path / "out.csv.partial").exists()
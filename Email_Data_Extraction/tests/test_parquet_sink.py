@@ -0,0 +1,44 @@
+import asyncio
+import os
+from decimal import Decimal
+
+import pyarrow.parquet as pq
+
+from parquet_sink import ParquetSink
+
+
+def row(month: int, amount: str) -> dict:
+    return {"Datetime": f"2024-{month:02d}-05 10:00:00", "Merchant Name": "Toko", "Amount": amount, "Currency": "IDR"}
+
+
+def read_amounts(directory: str) -> list[Decimal]:
+    return sorted(pq.read_table(directory, partitioning="hive").column("Amount").to_pylist())
+
+
+def test_flushed_rows_survive_a_killed_run(tmp_path):
+    directory = str(tmp_path / "parquet")
+    written = []
+
+    async def killed_run():
+        sink = ParquetSink(directory, flush_rows=1, flush_interval=0.01)
+        await sink.__aenter__()
+        await sink.write([row(1, "1000"), row(2, "2000")], lambda: written.append(1))
+        while not written:
+            await asyncio.sleep(0.01)
+        # Killed before the sink is closed: nothing is finalized
+        sink._flusher.cancel()  # type: ignore
+
+    asyncio.run(killed_run())
+    # A file that was being written when the process died
+    with open(os.path.join(directory, "month=2024-01", ".part-killed-00001.parquet.tmp"), "wb") as f:
+        f.write(b"PAR1")
+
+    async def resumed_run():
+        async with ParquetSink(directory, append=True) as sink:
+            await sink.write([row(1, "3000")])
+
+    asyncio.run(resumed_run())
+
+    assert read_amounts(directory) == [Decimal("1000"), Decimal("2000"), Decimal("3000")]
+    names = [name for _, _, files in os.walk(directory) for name in files]
+    assert not any(name.startswith(".") for name in names)
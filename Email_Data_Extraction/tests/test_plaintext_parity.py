@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from compare_plaintext import REFERENCE_BACKEND, run_extractors
+from extractors.plaintext import PLAINTEXT_BACKENDS, set_plaintext_backend
+from mail_sources import iter_messages
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Receipts kept with the tests, and the emails dumped by earlier runs, if there are any
+SAMPLE_DIRS = [os.path.join(HERE, "samples"), os.path.join(os.path.dirname(HERE), "dumped")]
+
+
+def sample_messages() -> list[tuple[str, bytes]]:
+    return [item for path in SAMPLE_DIRS if os.path.isdir(path) for item in iter_messages(path)]
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    yield
+    set_plaintext_backend(REFERENCE_BACKEND)
+
+
+@pytest.mark.parametrize("message_id, raw", sample_messages(), ids=lambda value: value if isinstance(value, str) else "")
+@pytest.mark.parametrize("backend", [backend for backend in PLAINTEXT_BACKENDS if backend != REFERENCE_BACKEND])
+def test_backend_matches_reference(backend: str, message_id: str, raw: bytes):
+    set_plaintext_backend(REFERENCE_BACKEND)
+    expected, expected_text, _ = run_extractors(raw)
+    set_plaintext_backend(backend)
+    results, text, _ = run_extractors(raw)
+
+    assert results == expected
+    # Backends may break lines differently on some inputs, but never change the words
+    assert (text or "").split() == (expected_text or "").split()
+
+
+def test_samples_give_transactions():
+    for message_id, raw in iter_messages(SAMPLE_DIRS[0]):
+        results, _, _ = run_extractors(raw)
+        assert results and all("error" not in result for result in results), message_id
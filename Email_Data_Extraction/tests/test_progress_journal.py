@@ -0,0 +1,142 @@
+import asyncio
+import sqlite3
+
+import extract_email_data
+import progress_journal
+from progress_journal import ERRORED, EXTRACTED, ProgressJournal
+from rate_limiter import GmailQuotaLimiter
+
+
+def test_errored_messages_are_given_up_after_max_attempts(tmp_path):
+    path = str(tmp_path / "progress.sqlite3")
+    journal = ProgressJournal(path, max_attempts=2)
+    journal.record_listed("bad")
+    journal.record_listed("good")
+
+    journal.record("bad", ERRORED, "404")
+    assert journal.pending_ids() == ["good", "bad"]
+    assert not journal.is_settled("bad")
+
+    journal.record("bad", ERRORED, "404")
+    assert journal.pending_ids() == ["good"]
+    assert journal.is_settled("bad")
+    assert journal.given_up_count() == 1
+    journal.close()
+
+    # --retry-failed
+    retrying = ProgressJournal(path, max_attempts=None)
+    assert retrying.pending_ids() == ["good", "bad"]
+    assert not retrying.is_settled("bad")
+    retrying.record("bad", EXTRACTED)
+    assert retrying.is_settled("bad")
+    retrying.close()
+
+
+def test_old_journal_gets_attempts_column(tmp_path):
+    path = str(tmp_path / "progress.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE messages (message_id TEXT PRIMARY KEY, outcome TEXT NOT NULL, detail TEXT, updated_at TEXT NOT NULL)"
+    )
+    conn.execute("INSERT INTO messages VALUES ('m', 'errored', 'raw fetch failed', '2024-01-01')")
+    conn.commit()
+    conn.close()
+
+    journal = ProgressJournal(path)
+    assert journal.pending_ids() == ["m"]
+    for _ in range(progress_journal.MAX_ATTEMPTS):
+        journal.record("m", ERRORED)
+    assert journal.pending_ids() == []
+    journal.close()
+
+
+class FakeGmail:
+    """
+    Stands in for the Gmail discovery document and Aiogoogle: a mailbox listed `page_size` messages at a time,
+    whose history records the messages added after each history ID
+    """
+
+    def __init__(self, message_ids: list[str], page_size: int):
+        self.message_ids = message_ids
+        self.page_size = page_size
+        self.added: dict[str, list[str]] = {}
+        self.requests: list[tuple[str, dict]] = []
+        self.users = self
+        self.messages = self.history = self
+
+    def list(self, **params):
+        kind = "history" if "startHistoryId" in params else "messages"
+        return kind, params
+
+    async def as_user(self, request):
+        self.requests.append(request)
+        kind, params = request
+        if kind == "history":
+            added = self.added.get(params["startHistoryId"], [])
+            records = [{"message": {"id": message_id, "labelIds": ["INBOX"]}} for message_id in added]
+            return {"history": [{"messagesAdded": records}]}
+
+        start = int(params["pageToken"] or 0)
+        response = {"messages": [{"id": message_id} for message_id in self.message_ids[start : start + self.page_size]]}
+        if start + self.page_size < len(self.message_ids):
+            response["nextPageToken"] = str(start + self.page_size)
+        return response
+
+
+def list_new(gmail: FakeGmail, journal: ProgressJournal, history_id: str, limit: int, complete: bool = True) -> list[str]:
+    async def run():
+        listed = []
+        async for message_id in extract_email_data.list_new_message_ids(
+            gmail, GmailQuotaLimiter(units_per_second=1e9), gmail, journal, history_id, limit
+        ):
+            listed.append(message_id)
+            if complete:
+                journal.record(message_id, EXTRACTED)
+        return listed
+
+    return asyncio.run(run())
+
+
+def test_limit_cutting_a_page_short_continues_within_it(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "progress.sqlite3"))
+    gmail = FakeGmail([f"m{i}" for i in range(10)], page_size=4)
+
+    assert list_new(gmail, journal, "h1", limit=3) == ["m0", "m1", "m2"]
+    assert list_new(gmail, journal, "h1", limit=3) == ["m3", "m4", "m5"]
+    assert list_new(gmail, journal, "h1", limit=10) == ["m6", "m7", "m8", "m9"]
+    assert extract_email_data.scan_in_progress(journal) is False
+    journal.close()
+
+
+def test_new_mail_is_synced_while_a_scan_is_unfinished(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "progress.sqlite3"))
+    gmail = FakeGmail([f"m{i}" for i in range(10)], page_size=4)
+
+    assert list_new(gmail, journal, "h1", limit=5) == ["m0", "m1", "m2", "m3", "m4"]
+    assert extract_email_data.scan_in_progress(journal)
+
+    # Mail arriving after the scan started comes from the history, before the scan goes on
+    gmail.added["h1"] = ["new1", "m2"]
+    gmail.requests.clear()
+    assert list_new(gmail, journal, "h2", limit=2) == ["new1", "m5", "m6"]
+    assert gmail.requests[0][0] == "history"
+    assert journal.get_checkpoint("history_id") == "h2"
+
+    # Once the scan has finished, only the history is listed
+    assert list_new(gmail, journal, "h3", limit=10) == ["m7", "m8", "m9"]
+    gmail.added["h3"] = ["new2"]
+    gmail.requests.clear()
+    assert list_new(gmail, journal, "h4", limit=10) == ["new2"]
+    assert [kind for kind, _ in gmail.requests] == ["history"]
+    journal.close()
+
+
+def test_messages_listed_but_not_completed_are_not_lost(tmp_path):
+    journal = ProgressJournal(str(tmp_path / "progress.sqlite3"))
+    gmail = FakeGmail([f"m{i}" for i in range(6)], page_size=4)
+
+    # Interrupted before any message was completed
+    assert list_new(gmail, journal, "h1", limit=2, complete=False) == ["m0", "m1"]
+    assert list_new(gmail, journal, "h1", limit=2) == ["m0", "m1", "m2", "m3"]
+    assert list_new(gmail, journal, "h1", limit=10) == ["m4", "m5"]
+    journal.close()
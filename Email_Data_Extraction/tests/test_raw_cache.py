@@ -0,0 +1,38 @@
+import asyncio
+
+from raw_cache import RawMessageCache
+
+
+def test_every_get_counts_once(tmp_path):
+    RawMessageCache(str(tmp_path)).put("m1", b"Subject: hi\r\n\r\nbody")
+
+    cache = RawMessageCache(str(tmp_path))
+    asyncio.run(cache.load())
+
+    assert cache.get("m1") == b"Subject: hi\r\n\r\nbody"
+    assert cache.get("m2") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache._total_bytes > 0
+
+
+def test_batches_are_read_and_written_in_a_thread(tmp_path, monkeypatch):
+    cache = RawMessageCache(str(tmp_path), max_bytes=10**9)
+    threads = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(func, *args):
+        threads.append(func)
+        return await to_thread(func, *args)
+
+    monkeypatch.setattr(asyncio, "to_thread", recording_to_thread)
+
+    async def run():
+        await cache.put_many({f"m{i}": f"Subject: {i}\r\n\r\nbody".encode() for i in range(20)})
+        return await asyncio.gather(*(cache.get_many([f"m{i}", "missing"]) for i in range(20)))
+
+    batches = asyncio.run(run())
+
+    assert len(threads) == 21
+    assert batches == [{f"m{i}": f"Subject: {i}\r\n\r\nbody".encode()} for i in range(20)]
+    assert (cache.hits, cache.misses) == (20, 20)
+    assert len(cache._index) == 20  # type: ignore
@@ -0,0 +1,161 @@
+import email
+import email.policy
+import math
+import os
+import random
+from io import StringIO
+
+import pandas as pd
+import pytest
+
+from extractors.base_extractor import EmailContent
+from extractors.tables import HtmlTables
+from mail_sources import iter_messages
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = os.path.join(HERE, "samples")
+
+# pd.read_html options that keep cells as written, so text can be compared with text
+READ_HTML_OPTIONS = {"thousands": None, "keep_default_na": False}
+
+
+def read_html(html: str, displayed_only: bool = True) -> list[pd.DataFrame]:
+    try:
+        return pd.read_html(StringIO(html), displayed_only=displayed_only, **READ_HTML_OPTIONS)
+    except ValueError as e:
+        if str(e) != "No tables found":
+            raise e
+        return []
+
+
+def same_cell(text: str, value) -> bool:
+    if isinstance(value, str):
+        return text == value
+    # pandas still reads plain numbers as numbers
+    if isinstance(value, float) and math.isnan(value):
+        return text == ""
+    return float(text) == float(value)
+
+
+def assert_same_tables(tables: HtmlTables, dfs: list[pd.DataFrame]):
+    assert len(tables) == len(dfs)
+    for index, (table, df) in enumerate(zip(tables, dfs)):
+        assert tables[index] is table
+        assert len(table.rows) == len(df), index
+        for row, values in zip(table.rows, df.values.tolist()):
+            assert len(row) == len(values), index
+            assert all(same_cell(text, value) for text, value in zip(row, values)), (index, row, values)
+
+
+@pytest.mark.parametrize("message_id, raw", list(iter_messages(SAMPLES)), ids=lambda value: value if isinstance(value, str) else "")
+def test_sample_tables_match_read_html(message_id: str, raw: bytes):
+    content = EmailContent(email.message_from_bytes(raw, policy=email.policy.default))  # type: ignore
+
+    assert_same_tables(content.get_tables(), content.get_dfs(**READ_HTML_OPTIONS))
+
+
+CASES = {
+    "colspan and rowspan": """
+        <table>
+          <tr><th>Item</th><th colspan="2">Price</th></tr>
+          <tr><td rowspan="2">Pulsa</td><td>Rp</td><td>10.000</td></tr>
+          <tr><td colspan="2">Rp 2.500</td></tr>
+          <tr><td>Total</td><td>Rp</td><td rowspan="3">12.500</td></tr>
+        </table>
+    """,
+    "hidden tables and cells": """
+        <table style="display: none"><tr><td>preheader</td></tr></table>
+        <table>
+          <tr><td>Merchant</td><td style="display:none">tracking</td><td>Toko</td></tr>
+          <tr><td>Amount</td><td>Rp 5.000</td></tr>
+        </table>
+    """,
+    "empty tables and rows": """
+        <table></table>
+        <table><tr></tr><tr><td></td></tr></table>
+        <table><tr><td>
+</td></tr></table>
+        <table>
+          <tr><td>a</td></tr>
+          <tr></tr>
+          <tr><td></td></tr>
+          <tr><td>b</td></tr>
+        </table>
+        <table><tr><td></td><td></td></tr></table>
+    """,
+    "header sections": """
+        <table>
+          <thead><tr><th>Tanggal</th><th>Keterangan</th></tr></thead>
+          <tbody><tr><td>20 Nov</td><td>Token <br>Listrik</td></tr></tbody>
+          <tfoot><tr><td colspan="2">Terima kasih</td></tr></tfoot>
+        </table>
+        <table>
+          <tr><th>a</th><th>b</th></tr>
+          <tr><th></th><th></th></tr>
+          <tr><td>c</td><td>d</td></tr>
+        </table>
+    """,
+    "nested tables": """
+        <table><tr><td>outer
+          <table><tr><td>inner</td><td>x</td></tr></table>
+        </td></tr></table>
+    """,
+}
+
+
+@pytest.mark.parametrize("displayed_only", [True, False])
+@pytest.mark.parametrize("html", CASES.values(), ids=CASES.keys())
+def test_synthetic_tables_match_read_html(html: str, displayed_only: bool):
+    assert_same_tables(HtmlTables(html, displayed_only), read_html(html, displayed_only))
+
+
+def random_table(rng: random.Random, depth: int = 0) -> str:
+    def cell() -> str:
+        tag = rng.choice(["td", "td", "th"])
+        attrs = ""
+        if rng.random() < 0.2:
+            attrs += f' colspan="{rng.randint(1, 3)}"'
+        if rng.random() < 0.2:
+            attrs += f' rowspan="{rng.randint(1, 3)}"'
+        if rng.random() < 0.1:
+            attrs += ' style="display: none"'
+        content = rng.choice(["a", "Rp 1.000", "", " x  y ", "1,5", "<br>z", "\n"])
+        if depth < 2 and rng.random() < 0.15:
+            content += random_table(rng, depth + 1)
+        return f"<{tag}{attrs}>{content}</{tag}>"
+
+    rows = "".join(
+        "<tr>" + "".join(cell() for _ in range(rng.randint(0, 4))) + "</tr>" for _ in range(rng.randint(0, 4))
+    )
+    wrap = rng.choice(["plain", "tbody", "thead"])
+    if wrap == "tbody":
+        rows = f"<tbody>{rows}</tbody>"
+    elif wrap == "thead":
+        rows = f"<thead><tr><th>h</th><th>i</th></tr></thead><tbody>{rows}</tbody>"
+    return f"<table>{rows}</table>"
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_tables_match_read_html(seed: int):
+    rng = random.Random(seed)
+    for _ in range(25):
+        html = "<html><body>" + "".join(random_table(rng) for _ in range(rng.randint(1, 4))) + "</body></html>"
+        displayed_only = rng.random() < 0.7
+        try:
+            dfs = read_html(html, displayed_only)
+        except Exception:
+            # pandas fails on some span layouts, there is nothing to compare with then
+            continue
+        assert_same_tables(HtmlTables(html, displayed_only), dfs)
+
+
+def test_select_finds_tables_by_css():
+    html = """
+        <table class="summary"><tr><td>Total</td><td>Rp 5.000</td></tr></table>
+        <div id="items"><table><tr><td>Pulsa</td></tr></table></div>
+        <table class="summary"><tr><td></td></tr></table>
+    """
+    tables = HtmlTables(html)
+
+    assert [table.rows for table in tables.select("table.summary")] == [[["Total", "Rp 5.000"]]]
+    assert tables.select("#items table") == [tables[1]]
@@ -0,0 +1,96 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from numpy_title_classifier import NumpyEmailTitleClassifier
+from title_vectorizer import TitleVectorizer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TRAINED = os.path.join(os.path.dirname(HERE), "trained")
+TOKENIZER_PATH = os.path.join(TRAINED, "tv_layer.pkl")
+KERAS_MODEL_PATH = os.path.join(TRAINED, "email_titles_nlp.keras")
+BUNDLE_PATH = os.path.join(TRAINED, "email_titles_nlp.bundle")
+
+# Token IDs and scores of the Keras TextVectorization layer and model, written by running this file
+REFERENCE_PATH = os.path.join(HERE, "reference", "title_classifier.json")
+
+TITLES = [
+    "Pembayaran Berhasil from:gojek.com",
+    "Terima kasih, pembayaranmu berhasil! from:tokopedia.com",
+    "Your receipt from Google Play from:google.com",
+    "Bukti Transfer - BRImo from:bri.co.id",
+    "Weekly newsletter: 10 tips to save money from:medium.com",
+    "Re: Fwd: meeting tomorrow?? from:gmail.com",
+    "PROMO SPESIAL 12.12!!! Diskon s/d 90% from:shopee.co.id",
+    "Ihre Bestellung bei Müller – Straße from:mueller.de",
+    "ÉCOLE ÉTÉ résumé from:example.fr",
+    "Tab\tseparated\ntitle\r\nwith\x0bodd\x0cwhitespace from:example.com",
+    "non breaking spaces from:example.com",
+    "emoji 🎉 order #INV/20241120/MPL/4821 confirmed from:tokopedia.com",
+    " ".join(["token"] * 30) + " from:example.com",
+    "",
+    "   ",
+    "!!!",
+]
+
+
+def load_reference() -> dict:
+    with open(REFERENCE_PATH) as f:
+        return json.load(f)
+
+
+def test_token_ids_match_text_vectorization():
+    reference = load_reference()
+    vectorizer = TitleVectorizer.from_pickle(TOKENIZER_PATH)
+
+    ids = vectorizer(reference["titles"])
+
+    assert ids.dtype == np.int32
+    assert ids.tolist() == reference["token_ids"]
+    # Titles vectorized on their own get the same IDs as in a batch
+    assert [vectorizer([title])[0].tolist() for title in reference["titles"]] == reference["token_ids"]
+
+
+def test_numpy_scores_match_keras_model():
+    reference = load_reference()
+    classifier = NumpyEmailTitleClassifier(BUNDLE_PATH)
+
+    scores = classifier.score(reference["titles"])
+
+    np.testing.assert_allclose(scores, reference["scores"], rtol=1e-5, atol=1e-6)
+
+
+def test_reference_covers_the_titles():
+    assert load_reference()["titles"] == TITLES
+
+
+def write_reference():
+    """
+    Run the titles through the Keras layer and model, loaded the way title_classifier did before TitleVectorizer
+    """
+    import pickle
+
+    import keras
+    import tensorflow as tf
+
+    with open(TOKENIZER_PATH, "rb") as handle:
+        from_disk = pickle.load(handle)
+    layer = keras.layers.TextVectorization.from_config(from_disk["config"])
+    layer.adapt(tf.data.Dataset.from_tensor_slices(["xyz"]))
+    layer.set_vocabulary(from_disk["vocabulary"])
+    model = keras.models.load_model(KERAS_MODEL_PATH, compile=False)
+
+    token_ids = np.asarray(layer(tf.constant(TITLES)))
+    scores = model.predict(token_ids, verbose=0)
+    with open(REFERENCE_PATH, "w") as f:
+        json.dump(
+            {"titles": TITLES, "token_ids": token_ids.tolist(), "scores": [float(score[0]) for score in scores]},
+            f,
+            indent=1,
+        )
+
+
+if __name__ == "__main__":
+    write_reference()
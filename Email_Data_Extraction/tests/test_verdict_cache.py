@@ -0,0 +1,36 @@
+from extract_email_data import create_title_classifier, open_verdict_cache
+from verdict_cache import VerdictCache
+
+
+def test_model_is_hashed_on_first_use_only(tmp_path):
+    calls = []
+
+    def model_hash():
+        calls.append(True)
+        return "abc"
+
+    path = str(tmp_path / "verdicts.json")
+    cache = VerdictCache(model_hash, path=path)
+    cache.save()
+    assert calls == []
+
+    cache.put("Receipt from:example.com", 0.9)
+    cache.save()
+    assert calls == [True]
+    assert VerdictCache("abc", path=path).get("Receipt from:example.com") == 0.9
+    assert VerdictCache("other", path=path).get("Receipt from:example.com") is None
+
+
+def test_missing_model_files_disable_saving(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache = open_verdict_cache("tflite-int8")
+
+    assert cache.get("Receipt from:example.com") is None
+    cache.put("Receipt from:example.com", 0.9)
+    cache.save()
+    assert not (tmp_path / "cache").exists()
+
+
+def test_verdict_cache_can_be_turned_off():
+    classifier, verdicts = create_title_classifier("numpy", verdict_cache=False)
+    assert verdicts is None and classifier.cache is None
@@ -0,0 +1,66 @@
+import numpy as np
+
+from title_vectorizer import TitleVectorizer
+
+# Prefer the standalone interpreters, which don't need all of TensorFlow
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+
+        Interpreter = tf.lite.Interpreter
+
+
+class TFLiteEmailTitleClassifier:
+    """
+    The email title classifier as a (quantized) TFLite flatbuffer, as converted by
+    export_title_classifier.py, with the same `score`/`predict` API as EmailTitleClassifier.
+
+    Quantized inputs and outputs are converted with their quantization parameters, so
+    full-integer models can be used as well.
+    """
+
+    def __init__(self, model_path: str, tokenizer_path: str, num_threads: int = 1):
+        self.vectorizer = TitleVectorizer.from_pickle(tokenizer_path)
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self._batch_size = None
+
+    def _quantize(self, x: np.ndarray) -> np.ndarray:
+        dtype = self.input["dtype"]
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            x = np.round(x / scale + zero_point)
+        return x.astype(dtype)
+
+    def _dequantize(self, y: np.ndarray) -> np.ndarray:
+        scale, zero_point = self.output["quantization"]
+        if scale:
+            return (y.astype(np.float32) - zero_point) * scale
+        return y.astype(np.float32)
+
+    def score(self, titles: list[str]) -> list[float]:
+        """
+        Probability of each title belonging to a transaction email
+        """
+        if not titles:
+            return []
+
+        ids = self.vectorizer(titles)
+        if self._batch_size != len(titles):
+            self.interpreter.resize_tensor_input(self.input["index"], list(ids.shape))
+            self.interpreter.allocate_tensors()
+            self._batch_size = len(titles)
+
+        self.interpreter.set_tensor(self.input["index"], self._quantize(ids.astype(np.float32)))
+        self.interpreter.invoke()
+        predictions = self._dequantize(self.interpreter.get_tensor(self.output["index"]))
+
+        return [float(pred[0]) for pred in predictions]
+
+    def predict(self, titles: list[str], threshold: float = 0.5):
+        return [score > threshold for score in self.score(titles)]
@@ -2,22 +2,28 @@ import tensorflow as tf
 import keras
 import pandas as pd
 import numpy as np
-import pickle
+
+from title_vectorizer import TitleVectorizer
 
 
 class EmailTitleClassifier:
     def __init__(self, model_path: str, tokenizer_path: str):
-        self.model = keras.models.load_model(model_path, compile=True)
-        with open(tokenizer_path, "rb") as handle:
-            from_disk = pickle.load(handle)
-            self.vectorizer = keras.layers.TextVectorization.from_config(from_disk['config'])
-            # You have to call `adapt` with some dummy data (BUG in Keras)
-            self.vectorizer.adapt(tf.data.Dataset.from_tensor_slices(["xyz"]))
-            self.vectorizer.set_vocabulary(from_disk["vocabulary"])
+        # Only used for inference, so the optimizer and metrics are not restored
+        self.model = keras.models.load_model(model_path, compile=False)
+        # Vectorizes a whole batch in one pass, with the same output as the TextVectorization layer
+        self.vectorizer = TitleVectorizer.from_pickle(tokenizer_path)
 
-    def predict(self, titles: list[str], threshold: float = 0.5):
-        titles = [self.vectorizer(title) for title in titles]
-        input_arr = np.array(titles)
-        predictions = self.model.predict(input_arr, verbose=0)  # type: ignore
+    def score(self, titles: list[str]) -> list[float]:
+        """
+        Probability of each title belonging to a transaction email
+        """
+        if not titles:
+            return []
+        # Calling the model directly avoids the per-call setup of `model.predict`
+        input_arr = self.vectorizer(titles)
+        predictions = np.asarray(self.model(input_arr, training=False))
 
-        return [True if pred > threshold else False for pred in predictions]
+        return [float(pred[0]) for pred in predictions]
+
+    def predict(self, titles: list[str], threshold: float = 0.5):
+        return [score > threshold for score in self.score(titles)]
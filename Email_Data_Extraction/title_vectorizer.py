@@ -0,0 +1,75 @@
+import pickle
+import re
+
+import numpy as np
+
+# Sequence length the title classifier was trained with
+MAX_LENGTH = 24
+
+# Characters removed by Keras' "lower_and_strip_punctuation" standardization
+STRIP_PUNCTUATION = re.compile(r'[!"#$%&()\*\+,-\./:;<=>?@\[\\\]^_`{|}~\']')
+
+# TensorFlow splits on ASCII whitespace only
+WHITESPACE = re.compile(r"[ \t\n\v\f\r]+")
+
+# Joins the titles of a batch so they are standardized together. It is neither whitespace
+# nor punctuation, so it survives standardization and splits the batch up again.
+_SEPARATOR = "\x00"
+
+
+def standardize(title: str) -> str:
+    """
+    Same as Keras' "lower_and_strip_punctuation": only ASCII letters are lowercased
+    """
+    return STRIP_PUNCTUATION.sub("", title.encode("utf-8").lower().decode("utf-8"))
+
+
+class TitleVectorizer:
+    """
+    Turn a batch of titles into token IDs, with the same output as the trained
+    TextVectorization layer: index 0 pads, index 1 is out of vocabulary, and every
+    sequence is padded or truncated to `sequence_length`.
+    """
+
+    def __init__(self, vocabulary: list[str], sequence_length: int = MAX_LENGTH):
+        self.vocabulary = [str(token) for token in vocabulary]
+        self.sequence_length = sequence_length
+        # The padding and OOV entries are never looked up
+        self.token_ids = {token: i for i, token in enumerate(self.vocabulary) if i > 1}
+
+    @classmethod
+    def from_pickle(cls, path: str) -> "TitleVectorizer":
+        """
+        Load the vectorizer saved by the training notebook (trained/tv_layer.pkl)
+        """
+        with open(path, "rb") as handle:
+            from_disk = pickle.load(handle)
+
+        config = from_disk["config"]
+        if (
+            config["standardize"] != "lower_and_strip_punctuation"
+            or config["split"] != "whitespace"
+            or config["output_mode"] != "int"
+            or config["ngrams"] is not None
+        ):
+            raise ValueError(f"Unsupported TextVectorization config in {path}")
+        return cls(from_disk["vocabulary"], config["output_sequence_length"])
+
+    def __call__(self, titles: list[str]) -> np.ndarray:
+        """
+        Token IDs of the titles, as an int32 array of shape (len(titles), sequence_length)
+        """
+        titles = [str(title) for title in titles]
+        if not titles:
+            return np.zeros((0, self.sequence_length), dtype=np.int32)
+        if any(_SEPARATOR in title for title in titles):
+            standardized = [standardize(title) for title in titles]
+        else:
+            standardized = standardize(_SEPARATOR.join(titles)).split(_SEPARATOR)
+
+        ids = np.zeros((len(titles), self.sequence_length), dtype=np.int32)
+        get = self.token_ids.get
+        for row, title in enumerate(standardized):
+            tokens = [token for token in WHITESPACE.split(title) if token][: self.sequence_length]
+            ids[row, : len(tokens)] = [get(token, 1) for token in tokens]
+        return ids
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from typing import Callable
+
+VERDICT_CACHE_PATH = "cache/title_verdicts.json"
+
+# Default number of titles kept
+VERDICT_CACHE_SIZE = 100_000
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class VerdictCache:
+    """
+    Bounded LRU cache of title classifier scores, keyed by the exact classifier input
+    ("{subject} from:{domain}").
+
+    Scores are only valid for the model that produced them, so the cache is tied to a hash
+    of the model file. With a `path`, it is loaded on first use and written back by `save`;
+    a saved cache for a different model is discarded.
+
+    `model_hash` can be a function, called on first use, so that model files are only hashed
+    when the cache is used. If it returns None, the model is unknown and the cache is neither
+    loaded nor saved.
+    """
+
+    def __init__(
+        self,
+        model_hash: str | Callable[[], str | None],
+        max_entries: int = VERDICT_CACHE_SIZE,
+        path: str | None = None,
+    ):
+        self._model_hash = model_hash
+        self.model_hash: str | None = None
+        self.max_entries = max_entries
+        self.path = path
+        self._scores: OrderedDict[str, float] = OrderedDict()
+        self._opened = False
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = False
+
+    def _open(self):
+        if self._opened:
+            return
+        self._opened = True
+        self.model_hash = self._model_hash() if callable(self._model_hash) else self._model_hash
+        if self.model_hash is None:
+            self.path = None
+        elif self.path is not None and os.path.exists(self.path):
+            self._load(self.path)
+
+    def _load(self, path: str):
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable verdict cache {path}: {e}")
+            return
+
+        if saved.get("model_hash") != self.model_hash:
+            # The model changed since the cache was written
+            self.invalidated = True
+            return
+        # Saved from least to most recently used
+        for key, score in saved["scores"][-self.max_entries :]:
+            self._scores[key] = score
+
+    def get(self, key: str) -> float | None:
+        self._open()
+        score = self._scores.get(key)
+        if score is None:
+            self.misses += 1
+            return None
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return score
+
+    def put(self, key: str, score: float):
+        self._open()
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.max_entries:
+            self._scores.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def save(self):
+        if not self._opened or self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model_hash": self.model_hash, "scores": list(self._scores.items())}, f)
+        os.replace(tmp_path, self.path)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> str:
+        report = (
+            f"Verdict cache: {self.hits} hits, {self.misses} misses ({self.hit_rate():.1%}), "
+            f"{len(self)} entries"
+        )
+        if self.invalidated:
+            report += ", saved entries discarded after a model change"
+        return report
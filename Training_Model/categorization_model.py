@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import matplotlib.pyplot as plt
 import random
 import nltk
@@ -28,6 +31,20 @@ def load_pickle(filename):
     with open(filename, 'rb') as f:
         return pickle.load(f)
 
+# Load a dataset from .xlsx, or from the Parquet output of extract_email_data.py --parquet
+def load_transactions(path):
+    """ Load the transactions from an .xlsx file, or from a Parquet file or month-partitioned directory. """
+    if path.endswith('.xlsx'):
+        return pd.read_excel(path)
+
+    table = ds.dataset(path, format='parquet', partitioning='hive').to_table()
+    if 'month' in table.column_names:
+        table = table.drop_columns(['month'])
+    # Amounts are stored as decimals, converting them to floats here is much faster than from Decimal objects
+    amount_index = table.schema.get_field_index('Amount')
+    table = table.set_column(amount_index, 'Amount', pc.cast(table['Amount'], pa.float64()))
+    return table.to_pandas()
+
 # Function for synonym replacement in the "Notes" column
 def augment_text_with_synonyms(text, num_replacements=2):
     words = text.split()
@@ -159,15 +176,15 @@ def create_model(input_dim, output_dim, category_encoding_layer, tfidf_vectorize
 
 # Training and evaluation function
 def train_and_evaluate(training_data_path, testing_data_path):
-    """Trains and evaluates the model using the provided training data from .xlsx."""
+    """Trains and evaluates the model using the provided training data from .xlsx or Parquet."""
 
-    # Load the training dataset from .xlsx file
-    train_df = pd.read_excel(training_data_path)
+    # Load the training dataset
+    train_df = load_transactions(training_data_path)
     print("Training DataFrame Shape:", train_df.shape)
     print(train_df.head())
 
-    # Load the test dataset from .xlsx file
-    test_df = pd.read_excel(testing_data_path)
+    # Load the test dataset
+    test_df = load_transactions(testing_data_path)
     print("Test DataFrame Shape (Before Setting 'Category' to NaN):", test_df.shape)
 
     # Ensure 'Category' column exists in the test data, set to NaN